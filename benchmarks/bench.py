@@ -0,0 +1,155 @@
+"""
+Throughput and peak-memory benchmarks for UN-T1..UN-T6, run_all, UN-CT1
+and CSV ingest over synthetic datasets of increasing size.
+
+    python benchmarks/bench.py                                # 1e3..1e6 rows
+    python benchmarks/bench.py --sizes 1e7,1e8 --only run_all
+    python benchmarks/bench.py --compare benchmarks/results/<sha>.json
+
+Results go to benchmarks/results/<git sha>.json. With --compare, any case
+slower than the baseline by more than --max-slowdown (or using more than
+--max-memory-growth times its peak memory) is reported and the exit code is 1.
+"""
+import argparse, functools, json, os, platform, re, subprocess, sys, tempfile, time, tracemalloc
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from make_synthetic import synthetic_h0, synthetic_metrology, metrology_chunks, write_chunks  # noqa: E402
+from un_reanchor import un_validation as uv  # noqa: E402
+from un_reanchor.un_ct1 import un_CT1_cosmology  # noqa: E402
+from un_reanchor.dataio import inspect_input  # noqa: E402
+from un_reanchor.sweep import sweep  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def _config(path=None):
+    with open(path or os.path.join(ROOT, "configs", "config.sample.yaml")) as f:
+        cfg = yaml.safe_load(f)
+    cfg["params"]["calibration_cut"] = cfg["params"].get("calibration_cut") or "2024-01-15"
+    return cfg
+
+def _anchors(k=4):
+    with open(os.path.join(ROOT, "configs", "uha_anchor.example.json")) as f:
+        base = json.load(f)
+    return [{**base, "anchor_id": f"A{j}", "value": base["value"] + j} for j in range(k)]
+
+def cases(opts):
+    """name -> (setup(rows) returning call arguments, function)."""
+    # one dataset per size, shared by every case (the tests never modify it)
+    data = functools.lru_cache(maxsize=1)(
+        lambda n: synthetic_metrology(n, repeat=opts.repeat_factor, instruments=opts.instruments, layout=opts.layout))
+    tests = {f"un_T{i}": getattr(uv, name) for i, name in enumerate([
+        "un_T1_inequality_coverage", "un_T2_guard_band", "un_T3_cross_instrument",
+        "un_T4_temporal_drift", "un_T5_edge_of_spec", "un_T6_interval_coverage"], start=1)}
+    out = {name: (lambda n: (data(n), opts.cfg), fn) for name, fn in tests.items()}
+    out["run_all"] = (lambda n: (data(n), opts.cfg), uv.run_all)
+    # per-instrument cuts plus a daily-step weekly drift series
+    t4_cfg = {**opts.cfg, "params": {**opts.cfg["params"], "calibration_cuts": {"A": ["2024-01-05", "2024-03-01"], "B": "2024-02-10"},
+                                     "drift_window": "7D", "drift_step": "1D"}}
+    out["un_T4_groups"] = (lambda n: (data(n), t4_cfg), uv.un_T4_temporal_drift)
+    out["un_CT1"] = (lambda n: (synthetic_h0(n), _anchors()), un_CT1_cosmology)
+    out["csv_ingest"] = (lambda n: (_csv_file(n, opts), opts.cfg), lambda path, cfg: inspect_input(path, cfg).read())
+    # end to end from CSV, default vs params.low_memory (compact_frame)
+    low_cfg = {**opts.cfg, "params": {**opts.cfg["params"], "low_memory": True}}
+    out["csv_validate"] = (lambda n: (_csv_file(n, opts), opts.cfg), lambda path, cfg: uv.run_all(inspect_input(path, cfg).read(), cfg))
+    out["csv_validate_low_memory"] = (lambda n: (_csv_file(n, opts), low_cfg),
+                                        lambda path, cfg: uv.run_all(uv.compact_frame(inspect_input(path, cfg).chunks(1 << 15), cfg), cfg))
+    # 20 gamma x 5 edge_delta grid points in one pass
+    out["sweep"] = (lambda n: (data(n), opts.cfg, [0.25 * i for i in range(1, 21)], None, [0.01, 0.02, 0.05, 0.1, 0.2]), sweep)
+    return out
+
+def _csv_file(n, opts):
+    path = os.path.join(opts.tmp, f"metrology_{n}.csv")
+    if not os.path.exists(path):
+        write_chunks(metrology_chunks(n, repeat=opts.repeat_factor, instruments=opts.instruments, layout=opts.layout), path)
+    return path
+
+def measure(fn, args, rows, repeat):
+    """Best-of-`repeat` wall time, then one traced call for peak Python/NumPy memory."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"rows": rows, "seconds": best, "rows_per_s": rows / best if best else None, "peak_mb": peak / 2**20}
+
+def run(opts):
+    results = {}
+    selected = {k: v for k, v in cases(opts).items() if not opts.only or re.search(opts.only, k)}
+    for rows in opts.sizes:
+        for name, (setup, fn) in selected.items():
+            args = setup(rows)
+            results[f"{name}@{rows}"] = r = measure(fn, args, rows, opts.repeat)
+            print(f"{name:<11} {rows:>11,d} rows  {r['seconds']:9.4f}s  {r['rows_per_s']:14,.0f} rows/s  {r['peak_mb']:9.1f} MiB",
+                  file=sys.stderr)
+            del args
+    return results
+
+def compare(results, baseline, max_slowdown=1.25, max_memory_growth=1.25, min_seconds=0.005):
+    """Cases that regressed against `baseline` beyond the thresholds (timings under min_seconds are noise)."""
+    regressions = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b:
+            continue
+        if r["seconds"] > max(b["seconds"], min_seconds) * max_slowdown:
+            regressions.append({"case": key, "metric": "seconds", "baseline": b["seconds"], "current": r["seconds"]})
+        if r["peak_mb"] > b["peak_mb"] * max_memory_growth and r["peak_mb"] - b["peak_mb"] > 1.0:
+            regressions.append({"case": key, "metric": "peak_mb", "baseline": b["peak_mb"], "current": r["peak_mb"]})
+    return regressions
+
+def _git_sha():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="un_reanchor benchmark suite")
+    ap.add_argument("--sizes", default="1e3,1e4,1e5,1e6", help="Comma-separated row counts (up to 1e8)")
+    ap.add_argument("--only", default="", help="Regex selecting cases (un_T1..un_T6, un_T4_groups, run_all, un_CT1, csv_ingest, csv_validate[_low_memory], sweep)")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed calls per case (best is kept)")
+    ap.add_argument("--repeat-factor", type=float, default=2.0, help="Mean measurements per part")
+    ap.add_argument("--instruments", type=int, default=3)
+    ap.add_argument("--layout", choices=["contiguous", "random"], default="random")
+    ap.add_argument("--config", default="", help="YAML config (default configs/config.sample.yaml)")
+    ap.add_argument("--out", default="", help="Results JSON (default benchmarks/results/<git sha>.json)")
+    ap.add_argument("--compare", default="", help="Baseline results JSON to check for regressions")
+    ap.add_argument("--max-slowdown", type=float, default=1.25)
+    ap.add_argument("--max-memory-growth", type=float, default=1.25)
+    opts = ap.parse_args(argv)
+    opts.sizes = [int(float(s)) for s in opts.sizes.split(",") if s]
+    opts.cfg = _config(opts.config)
+
+    with tempfile.TemporaryDirectory() as opts.tmp:
+        results = run(opts)
+    sha = _git_sha()
+    doc = {"meta": {"commit": sha, "python": platform.python_version(), "numpy": np.__version__,
+                    "pandas": pd.__version__, "machine": platform.machine(), "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+           "results": results}
+    out = opts.out or os.path.join(RESULTS_DIR, f"{sha}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(f"results: {out}", file=sys.stderr)
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, opts.max_slowdown, opts.max_memory_growth)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
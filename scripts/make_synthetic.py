@@ -1,43 +1,114 @@
-import argparse, csv, random
-from datetime import datetime, timedelta
+"""
+Synthetic metrology datasets and H0 tables, generated with NumPy in chunks
+so that 10^8-row files are written in bounded memory. The output depends
+only on the arguments (not on --chunk), e.g.
+
+    python scripts/make_synthetic.py --out data/demo.csv
+    python scripts/make_synthetic.py --out big.csv --rows 100000000 --repeat 4 --instruments 5
+    python scripts/make_synthetic.py --out h0.csv --kind h0 --rows 1000000
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+NOMINAL, TOL = 10.0, 0.05
+H0_FRAMES = ("early-CMB", "late-BAO+BBN", "late-TRGB", "late-Cepheid+SNe")
+_BLOCK = 1 << 16  # rows per random stream; fixes the output independently of the chunk size
+
+def _rng(seed, block):
+    return np.random.default_rng([seed, block])
+
+def metrology_chunks(rows, chunk=1_000_000, repeat=2.0, instruments=2, layout="contiguous",
+                     true_every=5, seed=42, start="2024-01-01", freq="1min"):
+    """
+    Yield DataFrames of the generic metrology schema (config.sample.yaml).
+    Each part is measured about `repeat` times by `instruments` instruments;
+    layout "contiguous" keeps a part's rows adjacent (sorted part_id),
+    "random" scatters them over the whole file.
+    """
+    n_parts = max(1, int(rows / repeat))
+    labels = np.array([chr(ord("A") + k) if instruments <= 26 else f"I{k}" for k in range(instruments)], dtype=object)
+    start, step = pd.Timestamp(start), pd.Timedelta(freq)
+    chunk = max(_BLOCK, chunk // _BLOCK * _BLOCK)
+    for lo in range(0, rows, chunk):
+        parts = []
+        for b in range(lo, min(lo + chunk, rows), _BLOCK):
+            n = min(_BLOCK, rows - b)
+            rng = _rng(seed, b // _BLOCK)
+            i = np.arange(b, b + n)
+            true_val = rng.normal(NOMINAL, 0.01, n)
+            U = np.abs(rng.normal(0.01, 0.002, n))
+            measured = rng.normal(true_val, U / 2.0)
+            part_id = (i * n_parts) // rows if layout == "contiguous" else rng.integers(0, n_parts, n)
+            parts.append(pd.DataFrame({
+                "part_id": part_id,
+                "nominal": NOMINAL, "tol_lower": TOL, "tol_upper": TOL,
+                "measured": measured,
+                "true_value": np.where(i % true_every == 0, true_val, np.nan) if true_every else np.nan,
+                "uncertainty_U": U,
+                "instrument_id": labels[rng.integers(0, instruments, n)],
+                "accepted": ((measured >= NOMINAL - TOL) & (measured <= NOMINAL + TOL)).astype(np.int8),
+                "timestamp": start + step * i,
+            }))
+        yield pd.concat(parts, ignore_index=True)
+
+def h0_chunks(rows, chunk=1_000_000, seed=42):
+    """Yield DataFrames of the H0 table schema (label, H0, uncertainty_U, frame)."""
+    chunk = max(_BLOCK, chunk // _BLOCK * _BLOCK)
+    frames = np.array(H0_FRAMES, dtype=object)
+    for lo in range(0, rows, chunk):
+        parts = []
+        for b in range(lo, min(lo + chunk, rows), _BLOCK):
+            n = min(_BLOCK, rows - b)
+            rng = _rng(seed, b // _BLOCK)
+            parts.append(pd.DataFrame({
+                "label": "m" + pd.Series(np.arange(b, b + n)).astype(str),
+                "H0": rng.normal(70.0, 2.5, n),
+                "uncertainty_U": rng.uniform(0.3, 3.0, n),
+                "frame": frames[rng.integers(0, len(frames), n)],
+            }))
+        yield pd.concat(parts, ignore_index=True)
+
+def synthetic_metrology(rows, **kw):
+    return pd.concat(list(metrology_chunks(rows, **kw)), ignore_index=True)
+
+def synthetic_h0(rows, **kw):
+    return pd.concat(list(h0_chunks(rows, **kw)), ignore_index=True)
+
+def write_chunks(chunks, out):
+    """Write chunks to CSV (header once) or, by extension, Parquet row groups."""
+    if out.lower().endswith((".parquet", ".pq")):
+        import pyarrow as pa, pyarrow.parquet
+        writer = None
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or pa.parquet.ParquetWriter(out, table.schema)
+            writer.write_table(table)
+        if writer:
+            writer.close()
+        return
+    with open(out, "w", newline="") as f:
+        for k, df in enumerate(chunks):
+            df.to_csv(f, header=k == 0, index=False, date_format="%Y-%m-%dT%H:%M:%S")
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--out", required=True)
+    ap.add_argument("--out", required=True, help="Output .csv or .parquet path")
+    ap.add_argument("--kind", choices=["metrology", "h0"], default="metrology")
+    ap.add_argument("--rows", type=float, default=120, help="Number of rows (1e8 is accepted)")
+    ap.add_argument("--repeat", type=float, default=2.0, help="Mean measurements per part")
+    ap.add_argument("--instruments", type=int, default=2, help="Number of distinct instruments")
+    ap.add_argument("--layout", choices=["contiguous", "random"], default="contiguous", help="Row order of a part's measurements")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--chunk", type=int, default=1_000_000, help="Rows generated and written per step")
     args = ap.parse_args()
 
-    random.seed(42)
-    start = datetime(2024,1,1)
-    rows = []
-    for i in range(120):
-        nominal = 10.0
-        tol = 0.05
-        true_val = random.gauss(nominal, 0.01)
-        U = abs(random.gauss(0.01, 0.002))
-        measured = random.gauss(true_val, U/2.0)
-        inst = "A" if i%3!=0 else "B"
-        part_id = i//2 if i%10==0 else i
-        timestamp = (start + timedelta(days=i)).isoformat()
-        LSL = nominal - tol
-        USL = nominal + tol
-        accepted = 1 if (LSL <= measured <= USL) else 0
-        rows.append({
-            "part_id": part_id,
-            "nominal": nominal,
-            "tol_lower": tol,
-            "tol_upper": tol,
-            "measured": measured,
-            "true_value": true_val if i%5==0 else "",
-            "uncertainty_U": U,
-            "instrument_id": inst,
-            "accepted": accepted,
-            "timestamp": timestamp
-        })
-
-    with open(args.out, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-        w.writeheader()
-        w.writerows(rows)
+    rows = int(args.rows)
+    if args.kind == "h0":
+        chunks = h0_chunks(rows, args.chunk, args.seed)
+    else:
+        chunks = metrology_chunks(rows, args.chunk, args.repeat, args.instruments, args.layout, seed=args.seed)
+    write_chunks(chunks, args.out)
 
 if __name__ == "__main__":
     main()
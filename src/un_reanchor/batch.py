@@ -0,0 +1,199 @@
+import glob, json, os
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, replace
+import numpy as np
+import pandas as pd
+import yaml
+from .dataio import inspect_input, write_decisions
+from .streaming import StreamingValidator
+from .net import fetch_to_cache, get_client, is_remote
+from .uha import resolve_uha_address
+from .profiling import Profiler, profiling, stage
+
+_SHARD_CHUNK = 1_000_000
+
+@dataclass
+class BatchJob:
+    data: str
+    config: str
+    out: str
+    uha: str = ""
+    shards: int = 1
+
+def _unique_out(out_root, data, taken):
+    stem = os.path.splitext(os.path.basename(data.split("?")[0]))[0] or "dataset"
+    name, i = stem, 1
+    while name in taken:
+        i += 1
+        name = f"{stem}_{i}"
+    taken.add(name)
+    return os.path.join(out_root, name)
+
+def collect_jobs(patterns, manifest, config, out_root, uha="", shards=1):
+    """
+    Build BatchJobs from glob patterns / paths (sharing `config` and `uha`)
+    and/or a YAML manifest:
+
+        defaults: {config: configs/config.sample.yaml, shards: 1}
+        datasets:
+          - data: line1/2024-06-01.csv
+          - {data: h0.csv, uha: "file:configs/uha_anchor.example.json", out: h0}
+    """
+    jobs, taken = [], set()
+    for pat in patterns:
+        paths = [pat] if pat.startswith(("http://", "https://")) else sorted(glob.glob(pat)) or [pat]
+        for p in paths:
+            if not config:
+                raise SystemExit(f"--config is required for dataset {p}")
+            jobs.append(BatchJob(p, config, _unique_out(out_root, p, taken), uha, shards))
+    if manifest:
+        with open(manifest) as f:
+            spec = yaml.safe_load(f) or {}
+        base = os.path.dirname(os.path.abspath(manifest))
+        defaults = {"config": config, "uha": uha, "shards": shards, **(spec.get("defaults") or {})}
+        for entry in spec.get("datasets", []):
+            entry = {**defaults, **({"data": entry} if isinstance(entry, str) else entry)}
+            data = entry["data"]
+            if not data.startswith(("http://", "https://")) and not os.path.isabs(data):
+                data = os.path.join(base, data)
+            if not entry.get("config"):
+                raise SystemExit(f"No config given for manifest dataset {data}")
+            out = os.path.join(out_root, entry["out"]) if entry.get("out") else _unique_out(out_root, data, taken)
+            taken.add(os.path.basename(out))
+            jobs.append(BatchJob(data, entry["config"], out, entry.get("uha") or "", int(entry.get("shards") or 1)))
+    return jobs
+
+def _run_job(job, chunksize, decisions_format, profile=False, anchors=None):
+    from .cli import run_dataset, _load_config
+    res = {"data": job.data, "out": job.out, "status": "ok", "report": None, "un_ct1": None}
+    try:
+        with profiling(Profiler(memory=True)) if profile else nullcontext():
+            with stage("fetch"):
+                data_path = fetch_to_cache(job.data) if is_remote(job.data) else job.data
+            kind, result, _ = run_dataset(data_path, _load_config(job.config), job.out, job.uha, anchors,
+                                          chunksize=chunksize, decisions_format=decisions_format)
+        res["report" if kind == "metrology" else "un_ct1"] = result
+    except (Exception, SystemExit) as e:
+        res.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return res
+
+def _try_fetch(url):
+    try:
+        return fetch_to_cache(url)
+    except Exception:
+        return url  # the job fetches again and reports the error itself
+
+def _try_resolve(address):
+    try:
+        return resolve_uha_address(address)
+    except Exception:
+        return address  # the job resolves it again and reports the error itself
+
+def _is_remote_anchor(address):
+    return is_remote(address) or address.startswith(("zenodo:", "doi:"))
+
+def _kind(data_path, cfg):
+    """Dataset kind from the header, or None when it cannot be read (the unsharded job reports why)."""
+    try:
+        return inspect_input(data_path, cfg).kind
+    except Exception:
+        return None
+
+def _part_hash(values):
+    # part ids are hashed as text (CSV parses them as str, see dataio.parse_options)
+    return pd.util.hash_pandas_object(pd.Series(values).astype(str), index=False).to_numpy()
+
+def _shard_task(data_path, cfg, shard, n_shards, chunksize):
+    """
+    Validate the rows of one part_id-hash shard; returns (validator, row
+    positions, decision codes). Every shard parses the whole file and keeps
+    its own rows, so a job with n shards parses it n times (in parallel):
+    sharding pays off when validation, mostly UN-T3 pairing, costs more than
+    parsing.
+    """
+    sv = StreamingValidator(cfg)
+    part_col = cfg["columns"].get("part_id")
+    positions, codes, offset = [], [], 0
+    for chunk in inspect_input(data_path, cfg).chunks(chunksize or _SHARD_CHUNK):
+        if part_col and part_col in chunk.columns:
+            mine = _part_hash(chunk[part_col]) % n_shards == shard
+        else:
+            mine = (np.arange(offset, offset + len(chunk)) % n_shards) == shard
+        idx = np.flatnonzero(mine)
+        if len(idx):
+            codes.append(sv.update(chunk.iloc[idx]))
+            positions.append(idx + offset)
+        offset += len(chunk)
+    sv._flush_parts(final=True)
+    cat = lambda parts, dt: np.concatenate(parts) if parts else np.array([], dtype=dt)
+    return sv, cat(positions, np.int64), cat(codes, np.int8), offset
+
+def _combine_shards(job, cfg, parts, decisions_format):
+    merged = parts[0][0]
+    for sv, *_ in parts[1:]:
+        merged.merge(sv)
+    report = merged.result()
+    codes = np.empty(parts[0][3], dtype=np.int8)
+    for _, pos, c, _n in parts:
+        codes[pos] = c
+    os.makedirs(job.out, exist_ok=True)
+    write_decisions(codes, os.path.join(job.out, f"decisions.{decisions_format}"))
+    with open(os.path.join(job.out, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def run_batch(jobs, out_root, workers=None, chunksize=0, decisions_format="csv", profile=False):
+    """
+    Run every job on one process pool and write out_root/summary.json.
+    Metrology jobs with shards > 1 are split into part_id-hash shards (so
+    UN-T3 only pairs rows within a shard) whose partial states are merged
+    here; H0 tables ignore shards.
+    With profile=True every unsharded job records its stage timings in its
+    report (see profiling).
+    """
+    from .cli import _load_config, _uha_addresses
+    os.makedirs(out_root, exist_ok=True)
+    # Download every distinct remote dataset and resolve every distinct remote
+    # anchor once, concurrently on the pooled client, before fanning out
+    tasks = {j.data: (lambda u=j.data: _try_fetch(u)) for j in jobs if is_remote(j.data)}
+    tasks.update({("uha", a): (lambda a=a: _try_resolve(a))
+                  for j in jobs for a in _uha_addresses(j.uha) if _is_remote_anchor(a)})
+    local = get_client().prefetch(tasks)
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = {}
+        for i, job in enumerate(jobs):
+            data_path = local.get(job.data, job.data)
+            cfg = _load_config(job.config) if job.shards > 1 else None
+            if cfg is not None and _kind(data_path, cfg) == "metrology":
+                pending[i] = ("shards", cfg,
+                              [ex.submit(_shard_task, data_path, cfg, s, job.shards, chunksize) for s in range(job.shards)])
+            else:
+                addresses = _uha_addresses(job.uha)
+                anchors = [local.get(("uha", a), a) for a in addresses] if any(map(_is_remote_anchor, addresses)) else None
+                pending[i] = ("job", ex.submit(_run_job, replace(job, data=data_path), chunksize, decisions_format, profile,
+                                               anchors))
+        for i, job in enumerate(jobs):
+            kind, *rest = pending[i]
+            if kind == "job":
+                results[i] = {**rest[0].result(), "data": job.data}
+                continue
+            cfg, futures = rest
+            res = {"data": job.data, "out": job.out, "status": "ok", "report": None, "un_ct1": None}
+            try:
+                res["report"] = _combine_shards(job, cfg, [f.result() for f in futures], decisions_format)
+            except (Exception, SystemExit) as e:
+                res.update(status="failed", error=f"{type(e).__name__}: {e}")
+            results[i] = res
+    summary = {
+        "jobs": [{**asdict(job), **res} for job, res in zip(jobs, results)],
+        "totals": {
+            "datasets": len(jobs),
+            "ok": sum(r["status"] == "ok" for r in results),
+            "failed": sum(r["status"] != "ok" for r in results),
+        },
+    }
+    with open(os.path.join(out_root, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
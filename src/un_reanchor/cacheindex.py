@@ -0,0 +1,51 @@
+"""
+Size-bounded on-disk caches: a locked JSON index of entries (file, size,
+last_access) and least-recently-used eviction. Shared by the download cache
+(net) and the result cache; kept free of network imports so the CLI can use
+it without loading them.
+"""
+import contextlib, json, os, tempfile
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: index updates are best effort
+    fcntl = None
+
+def atomic_write_text(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+@contextlib.contextmanager
+def locked_index(root):
+    """Locked read-modify-write access to root/index.json."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, "index.json")
+    with open(os.path.join(root, "index.lock"), "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path) as f:
+                    idx = json.load(f)
+            except (OSError, ValueError):
+                idx = {}
+            yield idx
+            atomic_write_text(path, json.dumps(idx, indent=1))
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def evict(idx, keep, max_bytes, root):
+    """Drop least recently used entries (and their files under root) until the index fits in max_bytes."""
+    total = sum(e.get("size", 0) for e in idx.values())
+    for key in sorted(idx, key=lambda k: idx[k].get("last_access", 0)):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        entry = idx.pop(key)
+        total -= entry.get("size", 0)
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(root, entry["file"]))
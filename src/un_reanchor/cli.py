@@ -1,68 +1,360 @@
 import argparse, json, os, sys
-import pandas as pd
-import yaml
-from .un_validation import run_all
-from .un_ct1 import un_CT1_cosmology
-from .net import fetch_to_cache
+from contextlib import nullcontext
+from .profiling import Profiler, active, profiling, stage
+from .resultcache import ResultCache
 
-def _maybe_run_un_ct1(data_path: str, out_dir: str, uha_address: str):
+# Heavy modules (pandas via un_validation/streaming/batch, yaml, net's HTTP
+# stack) are imported inside the functions that need them, so `--help` and
+# small H0 runs do not pay for them; see test_cli_startup.
+
+_REMOTE = ("http://", "https://")
+LOW_MEMORY_CHUNK = 1 << 15  # rows parsed at a time by low_memory runs
+
+def _run_un_ct1(df, out_dir: str, uha_address: str, anchors=None, params=None):
+    """
+    UN-CT1 on an H0 DataFrame (or a un_ct1.read_h0_csv table); writes results
+    CSV + summary JSON. `params` are the config params (Monte-Carlo settings).
+    """
+    from .un_ct1 import un_CT1_cosmology, un_CT1_table, write_results_csv
+    if not uha_address:
+        raise SystemExit("H0 dataset detected but --uha <ADDRESS> was not provided.")
+    # Several comma-separated addresses are evaluated together in one pass
+    addresses = anchors or _uha_addresses(uha_address)
+    anchor_arg = addresses if len(addresses) > 1 else addresses[0]
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "un_ct1_results.csv")
+    if isinstance(df, dict):
+        summary, cols = un_CT1_table(df, anchor_arg, params)
+        with stage("write_results", len(cols["label"])):
+            write_results_csv(cols, path)
+    else:
+        summary, res = un_CT1_cosmology(df, anchor_arg, params)
+        with stage("write_results", len(res)):
+            res.to_csv(path, index=False)
+    summary = _with_timings(summary)
+    _write_json(summary, os.path.join(out_dir, "un_ct1_summary.json"))
+    return summary
+
+def _read_h0(inp):
+    """Small CSV H0 tables are read without pandas; anything else through the DatasetInput."""
+    from .un_ct1 import SMALL_H0_BYTES, read_h0_csv
+    from .dataio import detect_format
+    if detect_format(inp.path) == "csv" and os.path.getsize(inp.path) <= SMALL_H0_BYTES:
+        with stage("parse") as st:
+            table = read_h0_csv(inp.path)
+            st.rows = len(table["H0"])
+        return table
+    return inp.read()
+
+def _with_timings(summary):
+    """Add the active profiler's `timings` block (stages finished so far) to a summary dict."""
+    prof = active()
+    return summary if prof is None else {**summary, "timings": prof.timings()}
+
+def _write_json(obj, path):
+    with stage("write_report"), open(path, "w") as f:
+        json.dump(obj, f, indent=2)
+
+def _maybe_run_un_ct1(data_path: str, out_dir: str, uha_address: str, anchors=None, params=None):
+    """Run UN-CT1 if data_path is an H0 table (detected from its header); else return None."""
+    from .dataio import inspect_input
     try:
-        # If data_path is remote, download first
-        if data_path.startswith("http://") or data_path.startswith("https://"):
-            cached = fetch_to_cache(data_path)
-            df = pd.read_csv(cached)
-        else:
-            df = pd.read_csv(data_path)
+        # If data_path is remote, download first (a no-op when main already prefetched it)
+        if data_path.startswith(_REMOTE):
+            from .net import fetch_to_cache
+            data_path = fetch_to_cache(data_path)
+        inp = inspect_input(data_path)
     except Exception:
         return None
-    required = {"label","H0","uncertainty_U","frame"}
-    if not required.issubset(set(df.columns)):
+    if inp.kind != "h0":
         return None
-    if not uha_address:
-        raise SystemExit("H0 dataset detected but --uha <ADDRESS> was not provided.")
-    summary, res = un_CT1_cosmology(df, uha_address)
+    return _run_un_ct1(_read_h0(inp), out_dir, uha_address, anchors, params)
+
+def _uha_addresses(uha_address: str):
+    return [a.strip() for a in uha_address.split(",") if a.strip()]
+
+def _prefetch_inputs(data: str, uha_address: str):
+    """
+    Download the remote --data file and resolve remote --uha anchors
+    concurrently. Returns (local data path, anchor dicts or None).
+    Anchor failures are deferred to UN-CT1 so they only surface if needed.
+    """
+    addresses = _uha_addresses(uha_address)
+    remote = [a for a in addresses if a.startswith(_REMOTE + ("zenodo:", "doi:"))]
+    if not remote and not data.startswith(_REMOTE):
+        return data, None
+    from .net import get_client
+    from .uha import resolve_uha_address
+    def soft(address):
+        def resolve():
+            try:
+                return resolve_uha_address(address)
+            except Exception:
+                return None
+        return resolve
+    tasks = {"data": data} if data.startswith(_REMOTE) else {}
+    tasks.update({("uha", a): soft(a) for a in remote})
+    got = get_client().prefetch(tasks)
+    anchors = None
+    if remote and all(got[("uha", a)] is not None for a in remote):
+        anchors = [got[("uha", a)] if a in remote else a for a in addresses]
+    return got.get("data", data), anchors
+
+def _run_generic(data_path, cfg: dict, out_dir: str, chunksize: int = 0, decisions_format: str = "csv",
+                 since_state: str = "", save_state: bool = False, cache=None):
+    """
+    Run UN-T1..UN-T6 on one dataset and write report.json + decisions into
+    out_dir. `data_path` may be a path or an already inspected DatasetInput.
+    With since_state / save_state the run goes through a resumable
+    StreamingValidator and its state is written to out_dir/state.npz; else a
+    resultcache.ResultCache `cache` supplies the tests computed before.
+    """
+    from .dataio import DatasetInput, inspect_input
+    inp = data_path if isinstance(data_path, DatasetInput) else inspect_input(data_path, cfg)
     os.makedirs(out_dir, exist_ok=True)
-    res.to_csv(os.path.join(out_dir, "un_ct1_results.csv"), index=False)
-    with open(os.path.join(out_dir, "un_ct1_summary.json"), "w") as f:
-        json.dump(summary, f, indent=2)
+    decisions_path = os.path.join(out_dir, f"decisions.{decisions_format}")
+    if since_state or save_state:
+        report = _run_incremental(inp, cfg, out_dir, chunksize, decisions_path, since_state)
+    elif cache is not None:
+        report = _run_cached(inp, cfg, chunksize, decisions_path, decisions_format, cache)
+    else:
+        report = _validate(inp, cfg, chunksize, decisions_path)
+    report = _with_timings(report)
+    _write_json(report, os.path.join(out_dir, "report.json"))
+    return report
+
+def _validate(inp, cfg, chunksize, decisions_path, tests=None):
+    """The report of `tests` (all by default; always all when streaming); decisions are written when UN-T2 runs."""
+    from .un_validation import run_all, compact_frame
+    from .dataio import write_decisions
+    from .streaming import run_all_chunked
+    if chunksize:
+        # parsing and decision writing are interleaved with validation chunk by chunk
+        return run_all_chunked(inp.chunks(chunksize), cfg, decisions_path)
+    frame = compact_frame(inp.chunks(LOW_MEMORY_CHUNK), cfg) if cfg["params"].get("low_memory") else inp.read()
+    report, decisions = run_all(frame, cfg, tests)
+    if decisions is not None:
+        write_decisions(decisions, decisions_path)
+    return report
+
+def _run_cached(inp, cfg, chunksize, decisions_path, decisions_format, cache):
+    """
+    _validate through the result cache: cached tests and decisions are reused
+    and only the missing tests are computed (every test when streaming or
+    with bootstrap intervals), then stored.
+    """
+    from .resultcache import report_keys
+    from .un_validation import TESTS
+    with stage("hash"):
+        keys = report_keys(cache.data_sha(inp.path), cfg, decisions_format)
+    hits = {e: cache.load(keys[e]) for e in TESTS + ("extras",)}
+    missing = [t for t in TESTS if hits[t] is None]
+    if not cache.fetch_file(keys["decisions"], decisions_path) and "UN-T2" not in missing:
+        missing.append("UN-T2")
+    if missing or hits["extras"] is None:
+        every = chunksize or cfg["params"].get("bootstrap_n")
+        fresh = _validate(inp, cfg, chunksize, decisions_path, None if every else missing)
+        for t in TESTS:
+            if t in fresh:
+                hits[t] = fresh[t]
+                cache.store(keys[t], fresh[t])
+        hits["extras"] = {k: v for k, v in fresh.items() if k not in TESTS}
+        cache.store(keys["extras"], hits["extras"])
+        if "UN-T2" in fresh:
+            cache.store_file(keys["decisions"], decisions_path)
+    return {**{t: hits[t] for t in TESTS}, **hits["extras"]}
+
+def _run_incremental(inp, cfg, out_dir, chunksize, decisions_path, since_state=""):
+    """
+    Validate only the rows appended since `since_state` (all rows without it),
+    merge them into the saved state and write the new state next to the report.
+    Decisions are written for the ingested rows only.
+    """
+    from .dataio import detect_format
+    from .streaming import StreamingValidator
+    size = os.path.getsize(inp.path)
+    if since_state:
+        sv = StreamingValidator.load_state(since_state, cfg, decisions_path)
+        offset = sv.meta.get("offset")
+        if offset and offset > size:
+            raise ValueError(f"{inp.path} is smaller than when {since_state} was saved; not an append-only log")
+        inp = inp.since(sv.n, offset)
+    else:
+        sv = StreamingValidator(cfg, decisions_path, keep_history=True)
+    for chunk in (inp.chunks(chunksize) if chunksize else [inp.read()]):
+        sv.update(chunk)
+    report = sv.result()
+    # The byte offset lets the next run seek past the rows seen so far; it is
+    # only trusted when the file did not grow while it was being read
+    offset = size if detect_format(inp.path) == "csv" and os.path.getsize(inp.path) == size else None
+    with stage("write_state"):
+        sv.save_state(os.path.join(out_dir, "state.npz"), offset=offset)
+    return report
+
+def run_dataset(data_path: str, cfg: dict, out_dir: str, uha_address: str = "", anchors=None,
+                chunksize: int = 0, decisions_format: str = "csv", since_state: str = "", save_state: bool = False,
+                cache=None):
+    """
+    Inspect the header once and dispatch on dataset kind: UN-T1..UN-T6 for
+    metrology data, UN-CT1 for H0 tables. Errors propagate to the caller.
+    Stages are recorded by the active profiler, if any (see profiling).
+    `cache` (a resultcache.ResultCache) reuses results of identical inputs.
+    Returns (kind, result summary, DatasetInput).
+    """
+    from .dataio import inspect_input
+    inp = inspect_input(data_path, cfg)
+    if inp.kind == "h0":
+        if since_state or save_state:
+            raise SystemExit("--since-state / --save-state apply to metrology datasets, not H0 tables.")
+        params = (cfg or {}).get("params")
+        if cache is not None and uha_address:
+            result = _run_un_ct1_cached(inp, out_dir, uha_address, anchors, params, cache)
+        else:
+            result = _run_un_ct1(_read_h0(inp), out_dir, uha_address, anchors, params)
+    else:
+        result = _run_generic(inp, cfg, out_dir, chunksize, decisions_format, since_state, save_state, cache)
+    return inp.kind, result, inp
+
+def _run_un_ct1_cached(inp, out_dir, uha_address, anchors, params, cache):
+    """_run_un_ct1, reusing the cached summary and results of the same data, anchors and Monte-Carlo settings."""
+    from .un_ct1 import _resolve_anchors
+    from .resultcache import ct1_key
+    anchors = _resolve_anchors(anchors or _uha_addresses(uha_address))
+    with stage("hash"):
+        key = ct1_key(cache.data_sha(inp.path), anchors, params)
+    os.makedirs(out_dir, exist_ok=True)
+    summary = cache.load(key)
+    if summary is not None and cache.fetch_file(key, os.path.join(out_dir, "un_ct1_results.csv")):
+        summary = _with_timings(summary)
+        _write_json(summary, os.path.join(out_dir, "un_ct1_summary.json"))
+        return summary
+    summary = _run_un_ct1(_read_h0(inp), out_dir, uha_address, anchors, params)
+    cache.store_file(key, os.path.join(out_dir, "un_ct1_results.csv"))
+    cache.store(key, {k: v for k, v in summary.items() if k != "timings"})
     return summary
 
+def run_sweep(data_path: str, cfg: dict, out_dir: str, gamma: str = "", coverage_k: str = "", edge_delta: str = ""):
+    """sweep.sweep on a metrology dataset with grids given as parse_grid strings; writes out_dir/sweep.csv."""
+    from .dataio import inspect_input
+    from .sweep import parse_grid, sweep
+    inp = inspect_input(data_path, cfg)
+    if inp.kind == "h0":
+        raise SystemExit("sweep applies to metrology datasets, not H0 tables.")
+    grid = {k: parse_grid(v) if v else None for k, v in (("gamma", gamma), ("coverage_k", coverage_k), ("edge_delta", edge_delta))}
+    table = sweep(inp.read(), cfg, **grid)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "sweep.csv")
+    with stage("write_results", len(table)):
+        table.to_csv(path, index=False)
+    return path
+
+def _profiler(args):
+    dump = getattr(args, "profile_dump", "")  # run only
+    if not (args.profile or dump):
+        return nullcontext()
+    return profiling(Profiler(memory=True, dump_dir=dump or None))
+
+def _load_config(path: str) -> dict:
+    import yaml
+    with open(path) as f:
+        return yaml.safe_load(f)
+
 def main():
     ap = argparse.ArgumentParser(prog="unreanchor", description="UN-Algebra retro-validation")
     sub = ap.add_subparsers(dest="cmd")
 
     runp = sub.add_parser("run", help="Run validation")
-    runp.add_argument("--data", required=True, help="CSV file path or URL (generic metrology OR H0 table)")
+    runp.add_argument("--data", required=True, help="CSV/Parquet/Arrow file path or URL (generic metrology OR H0 table)")
     runp.add_argument("--config", required=True, help="YAML config for generic tests")
     runp.add_argument("--out", required=True, help="Output directory")
-    runp.add_argument("--uha", default="", help="UHA address (file:/ doi:/ zenodo:/ https://) for cosmology UN-CT1")
+    runp.add_argument("--uha", default="", help="UHA address (file:/ doi:/ zenodo:/ https://) for cosmology UN-CT1; comma-separate several anchors")
+    runp.add_argument("--chunksize", type=int, default=0, help="Stream the input in chunks of N rows (bounded memory: UN-T3 rows spill to temporary files "
+                      "unless params.parts_contiguous; --save-state keeps them in memory)")
+    runp.add_argument("--decisions-format", choices=["csv", "parquet"], default="csv", help="Format of the decisions output")
+    runp.add_argument("--low-memory", action="store_true",
+                      help="float32 measurements and categorical ids in memory (sets params.low_memory; see README)")
+    runp.add_argument("--no-cache", action="store_true", help="Recompute everything instead of reusing the result cache (see README)")
+    runp.add_argument("--save-state", action="store_true", help="Also write a mergeable state file (state.npz) next to report.json")
+    runp.add_argument("--since-state", default="", help="Resume from a saved state: ingest only rows appended since, write the merged report and state")
+    runp.add_argument("--profile", action="store_true",
+                      help="Record wall time, rows/s and peak memory per stage into a 'timings' block of report.json")
+    runp.add_argument("--profile-dump", default="", help="Also write per-stage cProfile (.prof) and tracemalloc dumps to this directory")
+
+    batchp = sub.add_parser("batch", help="Validate many datasets on a process pool")
+    batchp.add_argument("--data", nargs="*", default=[], help="Dataset paths or glob patterns")
+    batchp.add_argument("--manifest", default="", help="YAML manifest listing datasets (data/config/out/uha/shards)")
+    batchp.add_argument("--config", default="", help="Default YAML config for datasets without their own")
+    batchp.add_argument("--out", required=True, help="Root output directory (one subdirectory per dataset)")
+    batchp.add_argument("--uha", default="", help="Default UHA address for H0 tables")
+    batchp.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    batchp.add_argument("--shards", type=int, default=1, help="Split each dataset into N part_id-hash shards")
+    batchp.add_argument("--chunksize", type=int, default=0, help="Read inputs in chunks of N rows")
+    batchp.add_argument("--decisions-format", choices=["csv", "parquet"], default="csv", help="Format of the decisions output")
+    batchp.add_argument("--profile", action="store_true", help="Add a per-stage 'timings' block to each report (unsharded jobs)")
+
+    sweepp = sub.add_parser("sweep", help="UN-T1/T2/T5/T6 over a grid of gamma / coverage_k / edge_delta values")
+    sweepp.add_argument("--data", required=True, help="Metrology CSV/Parquet/Arrow file path or URL")
+    sweepp.add_argument("--config", required=True, help="YAML config (its params are the defaults for unswept axes)")
+    sweepp.add_argument("--out", required=True, help="Output directory for sweep.csv")
+    for flag in ("--gamma", "--coverage-k", "--edge-delta"):
+        sweepp.add_argument(flag, default="", help='Values as "0.5,1,2" or "lo:hi:n" (n evenly spaced values)')
+    sweepp.add_argument("--profile", action="store_true", help="Print per-stage timings to stderr")
+
+    servep = sub.add_parser("serve", help="Long-running validation service over HTTP or a Unix socket")
+    servep.add_argument("--host", default="127.0.0.1", help="Address to bind (default: loopback only)")
+    servep.add_argument("--port", type=int, default=8765)
+    servep.add_argument("--socket", default="", help="Listen on this Unix socket path instead of TCP")
+    servep.add_argument("--config", default="", help="Default YAML config for requests that do not name one")
+    servep.add_argument("--workers", type=int, default=0, help="Concurrent validations (default: CPU count)")
+    servep.add_argument("--cache-size", type=int, default=64, help="Parsed configs / resolved anchors kept (LRU)")
+    servep.add_argument("--anchor-ttl", type=float, default=3600, help="Seconds a resolved UHA anchor is reused")
+    servep.add_argument("--data-root", default="", help="Only accept local data/config/out/anchor paths under this directory")
+    servep.add_argument("--allow-remote", action="store_true",
+                        help="With --data-root, still fetch remote data / anchor URLs named by requests")
+    servep.add_argument("--max-upload-mb", type=float, default=256, help="Largest request body accepted (default: 256)")
+    servep.add_argument("--quiet", action="store_true", help="Do not log requests")
 
     args = ap.parse_args()
+    if args.cmd == "serve":
+        from .serve import ValidationService, serve
+        service = ValidationService(args.config or None, args.workers or None, args.cache_size,
+                                    args.anchor_ttl, args.data_root or None, int(args.max_upload_mb * (1 << 20)),
+                                    args.allow_remote)
+        serve(service, args.host, args.port, args.socket or None, args.quiet)
+        return
+    if args.cmd == "batch":
+        from .batch import collect_jobs, run_batch
+        jobs = collect_jobs(args.data, args.manifest, args.config, args.out, args.uha, args.shards)
+        if not jobs:
+            raise SystemExit("No datasets matched --data / --manifest.")
+        summary = run_batch(jobs, args.out, args.workers or None, args.chunksize, args.decisions_format, args.profile)
+        print(json.dumps(summary["totals"], indent=2))
+        sys.exit(1 if summary["totals"]["failed"] else 0)
+    if args.cmd == "sweep":
+        with _profiler(args) as prof:
+            with stage("fetch"):
+                data_path, _ = _prefetch_inputs(args.data, "")
+            path = run_sweep(data_path, _load_config(args.config), args.out, args.gamma, args.coverage_k, args.edge_delta)
+        print(path)
+        if prof is not None:
+            print("[sweep] " + prof.summary(), file=sys.stderr)
+        return
     if args.cmd != "run":
         ap.print_help()
         sys.exit(1)
 
-    # Try generic tests (metrology)
-    try:
-        # If --data is remote, fetch with auth if needed
-        data_path = args.data
-        if data_path.startswith("http://") or data_path.startswith("https://"):
-            data_path = fetch_to_cache(data_path)
-        df_generic = pd.read_csv(data_path)
-        with open(args.config) as f:
-            cfg = yaml.safe_load(f)
-        report, decisions = run_all(df_generic, cfg)
-        os.makedirs(args.out, exist_ok=True)
-        with open(os.path.join(args.out, "report.json"), "w") as f:
-            json.dump(report, f, indent=2)
-        decisions.to_csv(os.path.join(args.out, "decisions.csv"), index=False)
-        print(json.dumps(report, indent=2))
-    except Exception as e:
-        # Not a generic dataset; proceed silently
-        pass
-
-    # Cosmology test if H0 table detected
-    ct1 = _maybe_run_un_ct1(args.data, args.out, args.uha)
-    if ct1:
-        print("\nUN-CT1 summary:")
-        print(json.dumps(ct1, indent=2))
+    with _profiler(args) as prof:
+        # Remote --data / --uha inputs are fetched once, concurrently
+        with stage("fetch"):
+            data_path, anchors = _prefetch_inputs(args.data, args.uha)
+        cfg = _load_config(args.config)
+        if args.low_memory:
+            cfg["params"]["low_memory"] = True
+        cache = None if args.no_cache else ResultCache.from_env()
+        kind, result, _ = run_dataset(data_path, cfg, args.out, args.uha, anchors, args.chunksize,
+                                      args.decisions_format, args.since_state, args.save_state, cache)
+    if kind == "h0":
+        print("UN-CT1 summary:")
+    print(json.dumps(result, indent=2))
+    if prof is not None:
+        print(f"[{kind}] " + prof.summary(), file=sys.stderr)
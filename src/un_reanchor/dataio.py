@@ -0,0 +1,272 @@
+import csv
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Dict, List, Optional
+import numpy as np
+from .profiling import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas (and un_validation, which needs it) is imported where a body is
+# parsed or written, so header inspection and the UN-CT1 fast path stay light
+
+_PARQUET = (".parquet", ".pq")
+_ARROW = (".arrow", ".feather", ".ipc")
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc, pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet/Arrow support requires pyarrow: pip install 'un-algebra-reanchor[arrow]'")
+    return pyarrow
+
+def detect_format(path: str) -> str:
+    p = path.lower()
+    if p.endswith(_PARQUET):
+        return "parquet"
+    if p.endswith(_ARROW):
+        return "arrow"
+    return "csv"
+
+def projected_columns(cfg):
+    """Columns named in the config mapping (plus 'sigma' for the coverage_k fallback)."""
+    cols = [c for c in (cfg or {}).get("columns", {}).values() if c]
+    return list(dict.fromkeys(cols + ["sigma"]))
+
+def _open_ipc(path):
+    pa = _pyarrow()
+    source = pa.memory_map(path, "r")
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(pa.memory_map(path, "r"))
+
+def _select(schema_names, columns):
+    return None if columns is None else [c for c in columns if c in schema_names]
+
+H0_COLUMNS = ("label", "H0", "uncertainty_U", "frame")
+# Config fields parsed as float64 / category / datetime (true_value is left to
+# inference: it is coerced with errors='coerce' by the tests)
+_FLOAT_FIELDS = ("nominal", "tol_lower", "tol_upper", "measured", "uncertainty_U")
+_CATEGORY_FIELDS = ("instrument_id", "part_family")
+
+def read_header(path: str) -> List[str]:
+    """Column names only, without parsing the body."""
+    fmt = detect_format(path)
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            return next(csv.reader(f), [])
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_schema(path, memory_map=True).names
+    return _open_ipc(path).schema.names
+
+def detect_kind(columns) -> str:
+    """'h0' for UN-CT1 tables (label, H0, uncertainty_U, frame), else 'metrology'."""
+    return "h0" if set(H0_COLUMNS).issubset(columns) else "metrology"
+
+def parse_options(kind: str, cfg, header):
+    """
+    Explicit read_csv options for a dataset kind: projected columns, float64
+    for numeric fields, category for instrument_id / part_family / frame,
+    str for part_id (category with params.low_memory) and datetime for
+    timestamp, restricted to columns present in `header`. part_id is always
+    text, so the same id parses to the same value in every chunk (never 5 in
+    one and 5.0 in another).
+    """
+    present = set(header)
+    if kind == "h0":
+        # round_trip parsing gives the same floats as Python's float(), i.e. as un_ct1.read_h0_csv
+        return {"columns": list(H0_COLUMNS),
+                "dtype": {"label": "str", "H0": "float64", "uncertainty_U": "float64", "frame": "category"},
+                "parse_dates": [], "float_precision": "round_trip"}
+    cols = cfg["columns"]
+    dtype = {cols[f]: "float64" for f in _FLOAT_FIELDS if cols.get(f) in present}
+    if "sigma" in present:
+        dtype["sigma"] = "float64"
+    # low_memory runs also intern part ids while parsing (see un_validation.compact_frame)
+    categories = _CATEGORY_FIELDS + (("part_id",) if cfg["params"].get("low_memory") else ())
+    dtype.update({cols[f]: "category" for f in categories if cols.get(f) in present})
+    if cols.get("part_id") in present:
+        dtype.setdefault(cols["part_id"], "str")
+    ts = cols.get("timestamp")
+    return {"columns": projected_columns(cfg), "dtype": dtype, "parse_dates": [ts] if ts in present else []}
+
+def _csv_kwargs(columns, dtype, parse_dates, float_precision=None):
+    kw = {"float_precision": float_precision} if float_precision else {}
+    if columns is not None:
+        kw["usecols"] = lambda c, w=frozenset(columns): c in w
+    if dtype:
+        kw["dtype"] = dtype
+    if parse_dates:
+        kw["parse_dates"] = list(parse_dates)
+    return kw
+
+def _csv_source(path, skip_rows, offset):
+    """
+    read_csv arguments for the rows after the first `skip_rows`: seek to a
+    byte `offset` when the previous read ended there on a line boundary,
+    else skip rows while parsing.
+    """
+    if offset:
+        with open(path, "rb") as f:
+            header = f.readline()
+            f.seek(offset - 1)
+            if offset >= len(header) and f.read(1) == b"\n":
+                names = next(csv.reader([header.decode()]))
+                src = open(path, "rb")
+                src.seek(offset)
+                return src, {"header": None, "names": names}
+    return path, {"skiprows": range(1, skip_rows + 1)} if skip_rows else {}
+
+def read_dataset(path: str, columns=None, dtype=None, parse_dates=None, skip_rows=0, offset=None,
+                 float_precision=None) -> "pd.DataFrame":
+    """
+    Read a CSV, Parquet or Arrow IPC/Feather file, loading only `columns`
+    that exist in the file (all columns when None). CSV bodies are parsed
+    with the given `dtype` / `parse_dates`; columnar formats keep their own
+    types. Arrow IPC files are memory-mapped; null-free numeric columns
+    reach pandas without a copy. The first `skip_rows` data rows are dropped
+    (for CSV, `offset` is the byte position where they end, if known).
+    """
+    import pandas as pd
+    fmt = detect_format(path)
+    if fmt == "csv":
+        src, kw = _csv_source(path, skip_rows, offset)
+        try:
+            return pd.read_csv(src, **kw, **_csv_kwargs(columns, dtype, parse_dates, float_precision))
+        finally:
+            if src is not path:
+                src.close()
+    if skip_rows:
+        return read_dataset(path, columns, dtype, parse_dates).iloc[skip_rows:].reset_index(drop=True)
+    pa = _pyarrow()
+    if fmt == "parquet":
+        pf = pa.parquet.ParquetFile(path, memory_map=True)
+        return pf.read(columns=_select(pf.schema_arrow.names, columns)).to_pandas(split_blocks=True)
+    reader = _open_ipc(path)
+    table = reader.read_all()
+    cols = _select(table.schema.names, columns)
+    if cols is not None:
+        table = table.select(cols)
+    return table.to_pandas(split_blocks=True)
+
+def iter_dataset(path: str, chunksize: int, columns=None, dtype=None, parse_dates=None, skip_rows=0, offset=None,
+                 float_precision=None):
+    """Yield DataFrame chunks of about `chunksize` rows from any supported format."""
+    import pandas as pd
+    fmt = detect_format(path)
+    if fmt == "csv":
+        src, kw = _csv_source(path, skip_rows, offset)
+        try:
+            yield from pd.read_csv(src, chunksize=chunksize, **kw,
+                                   **_csv_kwargs(columns, dtype, parse_dates, float_precision))
+        finally:
+            if src is not path:
+                src.close()
+        return
+    if skip_rows:
+        for chunk in iter_dataset(path, chunksize, columns, dtype, parse_dates, float_precision=float_precision):
+            if skip_rows >= len(chunk):
+                skip_rows -= len(chunk)
+                continue
+            yield chunk.iloc[skip_rows:].reset_index(drop=True)
+            skip_rows = 0
+        return
+    pa = _pyarrow()
+    if fmt == "parquet":
+        pf = pa.parquet.ParquetFile(path, memory_map=True)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=_select(pf.schema_arrow.names, columns)):
+            yield batch.to_pandas()
+        return
+    reader = _open_ipc(path)
+    cols = _select(reader.schema.names, columns)
+    batches = (reader.get_batch(i) for i in range(reader.num_record_batches)) \
+        if hasattr(reader, "num_record_batches") else iter(reader)
+    for batch in batches:
+        if cols is not None:
+            batch = batch.select(cols)
+        for s in range(0, batch.num_rows, chunksize):
+            yield batch.slice(s, chunksize).to_pandas()
+
+@dataclass
+class DatasetInput:
+    """
+    One input file after the header stage: its kind and the parse options
+    derived from the config, so the body is parsed exactly once. Reads are
+    recorded as the "parse" profiling stage.
+    """
+    path: str
+    kind: str
+    header: List[str]
+    options: Dict[str, object]
+
+    def since(self, rows: int, offset: Optional[int] = None) -> "DatasetInput":
+        """The same input restricted to rows after the first `rows` (an append-only log's new tail)."""
+        return replace(self, options={**self.options, "skip_rows": rows, "offset": offset})
+
+    def read(self) -> "pd.DataFrame":
+        with stage("parse") as st:
+            df = read_dataset(self.path, **self.options)
+            st.rows = len(df)
+        return df
+
+    def chunks(self, chunksize: int):
+        it = iter_dataset(self.path, chunksize, **self.options)
+        while True:
+            with stage("parse") as st:
+                chunk = next(it, None)
+                st.rows = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+def inspect_input(path: str, cfg=None) -> DatasetInput:
+    """Read the header once, detect the dataset kind and derive parse options."""
+    with stage("header"):
+        header = read_header(path)
+        kind = detect_kind(header)
+        if kind == "metrology" and cfg is None:
+            raise ValueError(f"{path}: metrology dataset needs a config with a columns mapping")
+        return DatasetInput(path, kind, header, parse_options(kind, cfg, header))
+
+class DecisionWriter:
+    """Incremental decisions writer: CSV text or a Parquet file with an int8 dictionary column."""
+    def __init__(self, path, fmt=None):
+        self.path = str(path)
+        self.fmt = fmt or ("parquet" if detect_format(self.path) == "parquet" else "csv")
+        if self.fmt == "parquet":
+            from .un_validation import DECISION_LABELS
+            pa = _pyarrow()
+            self._labels = pa.array(DECISION_LABELS)
+            self._schema = pa.schema([("decision", pa.dictionary(pa.int8(), pa.string()))])
+            self._f = pa.parquet.ParquetWriter(self.path, self._schema)
+        else:
+            self._f = open(self.path, "w", newline="")
+            self._f.write("decision\n")
+
+    def write(self, codes):
+        codes = np.asarray(codes, dtype=np.int8)
+        if self.fmt == "parquet":
+            pa = _pyarrow()
+            arr = pa.DictionaryArray.from_arrays(pa.array(codes, pa.int8()), self._labels)
+            self._f.write_table(pa.Table.from_arrays([arr], schema=self._schema))
+        else:
+            from .un_validation import _write_decision_codes
+            _write_decision_codes(self._f, codes)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_decisions(decisions, path, fmt=None):
+    codes = decisions.cat.codes.to_numpy() if hasattr(decisions, "cat") else np.asarray(decisions)
+    with stage("write_decisions", len(codes)), DecisionWriter(path, fmt) as w:
+        w.write(codes)
+    return str(path)
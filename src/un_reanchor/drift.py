@@ -0,0 +1,249 @@
+import hashlib, json
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+from .pairing import _factorize
+
+NAT = np.iinfo(np.int64).min  # int64 view of NaT
+
+def timestamp_ns(values):
+    """int64 nanoseconds since the epoch (tz-aware input in UTC); NaT -> NAT."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(s.dtype):
+        s = pd.to_datetime(s)
+    if s.dt.tz is not None:
+        s = s.dt.tz_convert("UTC").dt.tz_localize(None)
+    return s.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+def cut_ns(cut):
+    t = pd.Timestamp(cut)
+    if t.tz is not None:
+        t = t.tz_convert("UTC").tz_localize(None)
+    return int(t.value)
+
+def exact_group_sums(x, groups, n_groups):
+    """
+    Exact per-group sums of the finite values of a float array as Fractions
+    (NaN and inf are skipped, like pandas' skipna). 53-bit mantissas are split into three 18-bit limbs
+    whose per-(group, binary exponent) totals bincount accumulates exactly
+    in float64 (up to 2^35 rows per group), so sums of partial sums over
+    chunks are exactly the same value. No sort is needed.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    out = [Fraction(0)] * n_groups
+    finite = np.isfinite(x)
+    if not finite.all():
+        x, groups = x[finite], groups[finite]
+    if not len(x):
+        return out
+    mant, exp = np.frexp(x)
+    m = (mant * 2.0**53).astype(np.int64)
+    emin = int(exp.min())
+    n_exp = int(exp.max()) - emin + 1
+    key = groups * n_exp + (exp - emin)
+    n_keys = n_groups * n_exp
+    if n_keys > max(len(x), 1 << 16):
+        # widely spread exponents: number only the (group, exponent) pairs present
+        uniq, key = np.unique(key, return_inverse=True)
+        n_keys = len(uniq)
+    else:
+        uniq = None
+    limbs = [np.bincount(key, weights=w, minlength=n_keys) for w in (m >> 36, (m >> 18) & 0x3FFFF, m & 0x3FFFF)]
+    totals = {}  # group -> [integer total, binary exponent of its unit]
+    for k in np.flatnonzero(np.bincount(key, minlength=n_keys)):
+        gk = int(k if uniq is None else uniq[k])
+        g, e = divmod(gk, n_exp)
+        v = (int(limbs[0][k]) << 36) + (int(limbs[1][k]) << 18) + int(limbs[2][k])
+        # keys ascend by exponent within a group, so the first one is the group's smallest unit
+        t = totals.setdefault(g, [0, e])
+        t[0] += v << (e - t[1])
+    for g, (v, e) in totals.items():
+        out[g] = Fraction(v) * Fraction(2) ** (e + emin - 53)
+    return out
+
+def _as_list(v):
+    return list(v) if isinstance(v, (list, tuple)) else [v]
+
+def drift_plan(cfg):
+    """
+    Grouped UN-T4 settings from the config, or None when only the single
+    global calibration_cut is used:
+
+    - params.calibration_cuts: a list of cuts for every instrument, or a
+      mapping {instrument_id: cut or [cuts]} ("*" = every instrument)
+    - params.calibration_events: CSV of calibration events with columns
+      timestamp and instrument_id (blank = every instrument)
+    - columns.part_family: also split each cut by part family
+    - params.drift_window / drift_step: rolling-window mean series per
+      instrument (pandas offsets such as "7D"; step defaults to the window)
+
+    Cuts are stored as sorted int64 nanoseconds; instrument ids are matched
+    by their string form so YAML keys and CSV labels agree with the data.
+    """
+    p = cfg["params"]
+    spec, events = p.get("calibration_cuts"), p.get("calibration_events")
+    family = bool(cfg["columns"].get("part_family"))
+    window = p.get("drift_window")
+    if not (spec or events or family or window):
+        return None
+    shared = [p["calibration_cut"]] if p.get("calibration_cut") else []
+    per = {}
+    if isinstance(spec, dict):
+        for inst, cuts in spec.items():
+            (shared if inst == "*" else per.setdefault(str(inst), [])).extend(_as_list(cuts))
+    elif spec:
+        shared.extend(_as_list(spec))
+    if events:
+        ev = pd.read_csv(events, dtype={"instrument_id": "str"})
+        insts = ev["instrument_id"] if "instrument_id" in ev.columns else pd.Series([None] * len(ev))
+        for inst, cut in zip(insts, ev["timestamp"]):
+            (shared if pd.isna(inst) or inst == "" else per.setdefault(str(inst), [])).append(cut)
+    norm = lambda cuts: np.unique(np.array([cut_ns(c) for c in cuts], dtype=np.int64))
+    plan = {"shared": norm(shared), "per": {k: norm(v + shared) for k, v in per.items()},
+            "cuts": bool(spec or events or family), "family": family, "window": None, "step": None}
+    if window:
+        w = pd.Timedelta(window).value
+        step = pd.Timedelta(p.get("drift_step") or window).value
+        if w <= 0 or step <= 0 or w % step:
+            raise ValueError("drift_window must be a positive multiple of drift_step")
+        plan["window"], plan["step"] = w, step
+    table = {"shared": plan["shared"].tolist(), "per": {k: v.tolist() for k, v in sorted(plan["per"].items())}}
+    plan["digest"] = hashlib.sha256(json.dumps([table, window, p.get("drift_step")]).encode()).hexdigest()
+    return plan
+
+def _cuts_for(plan, inst):
+    return plan["per"].get(str(inst), plan["shared"]) if inst is not None else plan["shared"]
+
+def drift_partials(ts, instrument, family, measured, plan):
+    """
+    Mergeable UN-T4 partial sums for one batch of rows, as {key: [n rows,
+    n finite measured values, exact sum of the finite values]} with keys
+      ("seg", instrument, j)          rows between the instrument's cuts j-1 and j
+      ("fam", instrument, j, family)  the same, split by part family
+      ("win", instrument, bucket)     rows in drift_step bucket `bucket`
+
+    Segments of every instrument are found in one searchsorted over a
+    (instrument, cut rank) key: cut times are ranked among all distinct cut
+    times, so the keys stay small integers whatever the timestamp range.
+    """
+    ok = ts != NAT
+    ts, measured = ts[ok], np.asarray(measured, dtype=float)[ok]
+    out = {}
+    if not len(ts):
+        return out
+    if instrument is None:
+        icodes, labels = np.zeros(len(ts), dtype=np.int64), [None]
+    else:
+        icodes, labels, _ = _factorize(instrument[ok])
+    if plan["cuts"]:
+        tables = [_cuts_for(plan, lab) for lab in labels]
+        k = np.array([len(t) for t in tables], dtype=np.int64)
+        flat = np.concatenate(tables) if tables else np.array([], dtype=np.int64)
+        ranks = np.unique(flat)
+        width = len(ranks) + 1
+        cut_keys = np.repeat(np.arange(len(labels)), k) * width + np.searchsorted(ranks, flat, side="right")
+        row_keys = icodes * width + np.searchsorted(ranks, ts, side="right")
+        # segment ids: instrument i owns k_i + 1 consecutive segments
+        seg = np.searchsorted(cut_keys, row_keys, side="right") + icodes
+        seg_inst = np.repeat(np.arange(len(labels)), k + 1)
+        seg_local = np.arange(len(seg_inst)) - np.repeat(np.r_[0, np.cumsum(k + 1)[:-1]], k + 1)
+        _collect(out, measured, seg, len(seg_inst), lambda s: ("seg", labels[seg_inst[s]], int(seg_local[s])))
+        if plan["family"] and family is not None:
+            fcodes, flabels, _ = _factorize(family[ok])
+            nf = len(flabels)
+            _collect(out, measured, seg * nf + fcodes, len(seg_inst) * nf,
+                     lambda g: ("fam", labels[seg_inst[g // nf]], int(seg_local[g // nf]), flabels[g % nf]))
+    if plan["window"]:
+        b = ts // plan["step"]
+        lo = int(b.min())
+        span = int(b.max()) - lo + 1
+        key = icodes * span + (b - lo)
+        if len(labels) * span <= max(len(key), 1 << 16):
+            _collect(out, measured, key, len(labels) * span, lambda g: ("win", labels[g // span], g % span + lo))
+        else:
+            uniq, inv = np.unique(key, return_inverse=True)
+            _collect(out, measured, inv, len(uniq), lambda g: ("win", labels[uniq[g] // span], int(uniq[g] % span) + lo))
+    return out
+
+def _collect(out, x, groups, n_groups, key):
+    counts = np.bincount(groups, minlength=n_groups)
+    finite = np.bincount(groups[np.isfinite(x)], minlength=n_groups)
+    sums = exact_group_sums(x, groups, n_groups)
+    for g in np.flatnonzero(counts):
+        out[key(int(g))] = [int(counts[g]), int(finite[g]), sums[g]]
+
+def merge_partials(into, other):
+    for key, value in other.items():
+        slot = into.setdefault(key, [0, 0, Fraction(0)])
+        for i, v in enumerate(value):
+            slot[i] += v
+    return into
+
+def _order(label):
+    return (label is None, str(label))
+
+def _iso(ns):
+    """ISO 8601 strings for int64 nanosecond times (whole seconds when possible)."""
+    ns = np.asarray(ns, dtype=np.int64)
+    return np.datetime_as_string(ns.view("datetime64[ns]"), unit="ns" if (ns % 10**9).any() else "s").tolist()
+
+def _before_after(before, after):
+    bn, bf, bs = before or (0, 0, 0)
+    an, af, as_ = after or (0, 0, 0)
+    return {"before_n": bn, "after_n": an, "delta_mean": float(as_ / af - bs / bf) if bf and af else None}
+
+def drift_report(partials, plan):
+    """
+    Report entries from (merged) drift_partials: "cuts", one entry per
+    instrument and cut comparing the rows since the previous cut with the
+    rows up to the next one (by_family splits it per part family), and
+    "drift_series", the rolling-window mean per instrument with its drift
+    from the instrument's first window with a mean. Means are over finite
+    measurements; they are None where there are none.
+    """
+    res = {}
+    if plan["cuts"]:
+        fams = {}
+        for key in partials:
+            if key[0] == "fam":
+                fams.setdefault(key[1:3], set()).add(key[3])
+        cuts = []
+        for inst in sorted({key[1] for key in partials if key[0] == "seg"}, key=_order):
+            for j, c in enumerate(_cuts_for(plan, inst)):
+                entry = {"instrument_id": inst, "cut": _iso([c])[0],
+                         **_before_after(partials.get(("seg", inst, j)), partials.get(("seg", inst, j + 1)))}
+                if plan["family"]:
+                    names = fams.get((inst, j), set()) | fams.get((inst, j + 1), set())
+                    entry["by_family"] = [
+                        {"part_family": f, **_before_after(partials.get(("fam", inst, j, f)), partials.get(("fam", inst, j + 1, f)))}
+                        for f in sorted(names, key=_order)]
+                cuts.append(entry)
+        res["cuts"] = cuts
+    if plan["window"]:
+        buckets = {}
+        for key, v in partials.items():
+            if key[0] == "win":
+                buckets.setdefault(key[1], []).append((key[2], v))
+        span, series = plan["window"] // plan["step"], []
+        for inst in sorted(buckets, key=_order):
+            rows = sorted(buckets[inst], key=lambda r: r[0])
+            ends = np.array([b for b, _ in rows], dtype=np.int64)
+            lo = np.searchsorted(ends, ends - span, side="right")
+            cn = np.r_[0, np.cumsum([v[0] for _, v in rows])]
+            cf = np.r_[0, np.cumsum([v[1] for _, v in rows])]
+            n, nf = cn[1:] - cn[lo], cf[1:] - cf[lo]
+            # exact prefix sums over a common power-of-two denominator
+            sums = [v[2] for _, v in rows]
+            den = max(v.denominator for v in sums)
+            cs = [0]
+            for v in sums:
+                cs.append(cs[-1] + v.numerator * (den // v.denominator))
+            means = [float(Fraction(cs[i + 1] - cs[lo[i]], den * int(nf[i]))) if nf[i] else None for i in range(len(rows))]
+            first = next((m for m in means if m is not None), None)
+            starts, stops = _iso((ends - span + 1) * plan["step"]), _iso((ends + 1) * plan["step"])
+            series.extend({"instrument_id": inst, "window_start": a, "window_end": b, "n": int(k), "mean": mean,
+                           "drift": None if mean is None else mean - first}
+                          for a, b, k, mean in zip(starts, stops, n, means))
+        res["drift_series"] = series
+    return res
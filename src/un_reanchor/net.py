@@ -1,14 +1,33 @@
-import os, urllib.parse, urllib.request, pathlib
+import os, time, hashlib, shutil, tempfile, threading, contextlib, http.client
+import urllib.error, urllib.parse, urllib.request, pathlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from .cacheindex import evict, locked_index
 
-_CACHE_DIR = os.path.expanduser("~/.unreanchor_cache")
+_CACHE_DIR = os.path.expanduser(os.getenv("UNREANCHOR_CACHE_DIR", "~/.unreanchor_cache"))
+
+# Cache policy (environment):
+#   UNREANCHOR_CACHE_TTL        seconds a cached entry is served without revalidation (default 0)
+#   UNREANCHOR_OFFLINE          1/true: never touch the network, serve cached entries only
+#   UNREANCHOR_CACHE_MAX_BYTES  size bound for LRU eviction (default 2 GiB)
+_DEFAULT_MAX_BYTES = 2 * 1024**3
+
+class CacheMiss(OSError): pass
 
 def _ensure_cache():
     os.makedirs(_CACHE_DIR, exist_ok=True)
     return _CACHE_DIR
 
 def _build_auth_headers_for_url(url: str):
-    # Re-use the same env-based scheme as in uha.py for consistency
-    import os, urllib.parse
+    """
+    Build optional auth headers for domains that require an API key.
+    Controlled by environment variables (can also be mirrored by CLI flags in the caller):
+      - AYBLLC_API_DOMAIN: domain to match (default 'aybllc.org')
+      - AYBLLC_API_KEY: the secret key
+      - AYBLLC_API_AUTH_STYLE: one of: bearer | x-api-key | header:Name | query:param  (default: bearer)
+      - AYBLLC_API_HEADER_NAME: when using 'header:Name', choose the header (default 'X-API-Key')
+      - AYBLLC_API_QUERY_NAME: when using 'query:param', choose the param (default 'api_key')
+    Used for every remote fetch (datasets and UHA anchors) via FetchClient.
+    """
     parsed = urllib.parse.urlparse(url)
     host = parsed.netloc.lower()
     dom = os.getenv("AYBLLC_API_DOMAIN", "aybllc.org").lower()
@@ -29,32 +48,257 @@ def _build_auth_headers_for_url(url: str):
             pname = os.getenv("AYBLLC_API_QUERY_NAME","api_key")
             qparams[pname] = key
         else:
+            # default to bearer if unknown
             headers["Authorization"] = f"Bearer {key}"
     return headers, qparams
 
-def fetch_to_cache(url: str) -> str:
+def _env_flag(name):
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+def _cache_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+def _index():
+    """Locked read-modify-write access to the cache index (cache_dir/index.json)."""
+    return locked_index(_CACHE_DIR)
+
+def _evict(idx, keep, max_bytes):
+    evict(idx, keep, max_bytes, _CACHE_DIR)
+
+def cached_fetch(url: str, headers=None, query=None, name=None, ttl=None, offline=None, client=None) -> str:
     """
-    Download a remote resource (CSV/JSON/etc.) to cache, attaching API key
-    headers/query params for AYBLLC_API_DOMAIN if configured.
-    Returns the local cached file path.
+    Return a local path for `url` through the on-disk cache.
+
+    - Entries younger than `ttl` seconds (UNREANCHOR_CACHE_TTL) are served
+      without network access; older ones are revalidated with
+      If-None-Match / If-Modified-Since and a 304 reuses the cached file.
+    - offline (UNREANCHOR_OFFLINE) serves cached entries only, raising
+      CacheMiss when the URL was never fetched.
+    - If revalidation fails on a network error, the cached copy is served.
+    - Downloads stream to a temp file that is renamed into place, and the
+      index is updated under a file lock, so concurrent runs never see a
+      partial entry. Least recently used entries are evicted beyond
+      UNREANCHOR_CACHE_MAX_BYTES.
+
+    The cache key is the URL as given; auth passed through `headers` or
+    `query` (extra query parameters) is sent but never written to the index.
     """
     _ensure_cache()
-    import hashlib
-    headers, q = _build_auth_headers_for_url(url)
-    if q:
+    ttl = float(os.getenv("UNREANCHOR_CACHE_TTL", "0") or 0) if ttl is None else ttl
+    offline = _env_flag("UNREANCHOR_OFFLINE") if offline is None else offline
+    max_bytes = int(os.getenv("UNREANCHOR_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES))
+    key = _cache_key(url)
+    name = name or os.path.basename(urllib.parse.urlparse(url).path) or "payload.bin"
+    fname = f"{key}_{name}"
+    local = os.path.join(_CACHE_DIR, fname)
+
+    with _index() as idx:
+        entry = idx.get(key) if os.path.exists(local) else None
+        if entry and (offline or (ttl and time.time() - entry["fetched_at"] < ttl)):
+            entry["last_access"] = time.time()
+            return local
+    if offline:
+        raise CacheMiss(f"Offline mode and no cached copy of {url}")
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+    req_url = url
+    if query:
         parsed = urllib.parse.urlparse(url)
         current = dict(urllib.parse.parse_qsl(parsed.query))
-        current.update(q)
-        new_q = urllib.parse.urlencode(current)
-        url = urllib.parse.urlunparse(parsed._replace(query=new_q))
-
-    # deterministic cache file name
-    h = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
-    name = os.path.basename(urllib.parse.urlparse(url).path) or "payload.bin"
-    local = os.path.join(_CACHE_DIR, f"{h}_{name}")
-    req = urllib.request.Request(url, headers=headers or {})
-    with urllib.request.urlopen(req) as r:
-        data = r.read()
-    with open(local, "wb") as f:
-        f.write(data)
+        current.update(query)
+        req_url = urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(current)))
+    meta, contacted = None, True
+    try:
+        with (client or get_client()).open(req_url, req_headers) as r:
+            if r.status == 304:
+                if not entry:
+                    raise urllib.error.HTTPError(url, 304, "Not Modified without a cached copy", r.headers, None)
+            else:
+                fd, tmp = tempfile.mkstemp(dir=_CACHE_DIR, prefix=".tmp_")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        shutil.copyfileobj(r, f, 1 << 20)
+                    os.replace(tmp, local)
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp)
+                    raise
+                meta = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+    except urllib.error.HTTPError:
+        raise
+    except urllib.error.URLError:
+        if not entry:
+            raise
+        contacted = False
+
+    now = time.time()
+    with _index() as idx:
+        new = dict(idx.get(key) or entry or {}, file=fname, url=url, last_access=now)
+        if contacted:
+            new["fetched_at"] = now
+        if meta is not None:
+            new.update(meta, size=os.path.getsize(local))
+        idx[key] = new
+        _evict(idx, key, max_bytes)
     return local
+
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+class FetchClient:
+    """
+    Shared HTTP(S) client for remote datasets and UHA anchors.
+
+    - Keep-alive connections are pooled per (scheme, host, port).
+    - Concurrent fetches of the same URL share one in-flight download.
+    - prefetch() downloads several inputs at once on a thread pool.
+    Requests go through urllib instead when a proxy applies to the URL.
+    """
+    def __init__(self, max_idle_per_host=4, timeout=60, max_workers=8):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._idle = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self, key):
+        with self._lock:
+            conns = self._idle.get(key)
+            if conns:
+                return conns.pop(), True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for c in conns:
+                c.close()
+
+    def _request(self, url, headers):
+        parsed = urllib.parse.urlsplit(url)
+        key = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+        path = urllib.parse.urlunsplit(("", "", parsed.path or "/", parsed.query, ""))
+        hdrs = {"User-Agent": "unreanchor", **headers}
+        for attempt in (0, 1):
+            conn, reused = self._checkout(key)
+            try:
+                conn.request("GET", path, headers=hdrs)
+                return key, conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                conn.close()
+                if not reused or attempt:
+                    raise urllib.error.URLError(e)
+            except OSError as e:
+                conn.close()
+                raise urllib.error.URLError(e)
+
+    @contextlib.contextmanager
+    def open(self, url, headers=None):
+        """GET `url` following redirects; yields a response with .status/.headers/.read()."""
+        headers = dict(headers or {})
+        if urllib.parse.urlsplit(url).scheme not in ("http", "https") or \
+                urllib.request.getproxies() and not urllib.request.proxy_bypass(urllib.parse.urlsplit(url).hostname or ""):
+            try:
+                r = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout)
+            except urllib.error.HTTPError as e:
+                if e.code != 304:
+                    raise
+                r = e
+            try:
+                yield r
+            finally:
+                r.close()
+            return
+        for _ in range(10):
+            key, conn, r = self._request(url, headers)
+            if r.status in _REDIRECTS and r.getheader("Location"):
+                r.read()
+                self._release(key, conn, r)
+                url = urllib.parse.urljoin(url, r.getheader("Location"))
+                continue
+            if r.status >= 400:
+                r.read()
+                self._release(key, conn, r)
+                raise urllib.error.HTTPError(url, r.status, r.reason, r.headers, None)
+            try:
+                yield r
+                r.read()  # drain so the connection can be reused
+            finally:
+                self._release(key, conn, r)
+            return
+        raise urllib.error.URLError(f"Too many redirects for {url}")
+
+    def _release(self, key, conn, r):
+        if r.isclosed() and not r.will_close:
+            self._checkin(key, conn)
+        else:
+            conn.close()
+
+    def fetch(self, url, name=None):
+        """Cached, authenticated fetch of `url`; concurrent calls for one URL share a download."""
+        with self._lock:
+            fut = self._inflight.get(url)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[url] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            headers, q = _build_auth_headers_for_url(url)
+            fut.set_result(cached_fetch(url, headers=headers, query=q, name=name, client=self))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+        return fut.result()
+
+    def prefetch(self, tasks):
+        """
+        Run several fetches concurrently. `tasks` maps a key to a URL or to a
+        zero-argument callable (e.g. an anchor resolver); returns key -> result.
+        """
+        tasks = dict(tasks)
+        if not tasks:
+            return {}
+        call = lambda t: t() if callable(t) else self.fetch(t)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as ex:
+            futures = {k: ex.submit(call, t) for k, t in tasks.items()}
+            return {k: f.result() for k, f in futures.items()}
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client() -> FetchClient:
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = FetchClient()
+        return _CLIENT
+
+def is_remote(path: str) -> bool:
+    return path.startswith("http://") or path.startswith("https://")
+
+def fetch_to_cache(url: str) -> str:
+    """
+    Download a remote resource (CSV/JSON/etc.) to cache, attaching API key
+    headers/query params for AYBLLC_API_DOMAIN if configured.
+    Returns the local cached file path.
+    """
+    return get_client().fetch(url)
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# Group-size thresholds for the three pairing strategies:
+#   size <= SMALL_GROUP  -> shifted-slice comparison over all small groups at once
+#   size <= DENSE_LIMIT  -> per-group broadcast of the full |dm| > Ui+Uj matrix
+#   larger               -> interval counting with searchsorted (no pair materialization)
+SMALL_GROUP = 32
+DENSE_LIMIT = 2048
+
+def _float(x):
+    # float32 arrays of a compact_frame stay float32
+    x = np.asarray(x)
+    return x if x.dtype in (np.float32, np.float64) else x.astype(float)
+
+def _factorize(values):
+    if not isinstance(values, pd.Categorical):
+        values = pd.Series(values).to_numpy()
+    codes, uniques = pd.factorize(values)
+    labels = [x.item() if isinstance(x, np.generic) else x for x in uniques]
+    missing = None
+    if (codes < 0).any():
+        # Missing instrument ids get their own slot instead of wrapping to -1
+        missing = len(labels)
+        codes = np.where(codes < 0, missing, codes)
+        labels.append(None)
+    return codes, labels, missing
+
+def _tally(mat_pairs, mat_exceed, ci, cj, exceed):
+    lo, hi = np.minimum(ci, cj), np.maximum(ci, cj)
+    np.add.at(mat_pairs, (lo, hi), 1)
+    np.add.at(mat_exceed, (lo, hi), exceed)
+
+def _count_disjoint(a, b, sorted_b):
+    """Number of (i, j) with b_j < a_i, i.e. interval j lies entirely below interval i."""
+    ok = ~np.isnan(a)
+    return np.searchsorted(sorted_b, a[ok], side="left")
+
+def cross_instrument_pairs(part_id, instrument, measured, U, by_instrument=False,
+                           small_group=SMALL_GROUP, dense_limit=DENSE_LIMIT):
+    """
+    Count same-part measurement pairs whose difference exceeds the combined
+    expanded uncertainty, |m_i - m_j| > U_i + U_j. Only parts measured by at
+    least two distinct instruments contribute, and every pair of rows in such
+    a part is counted (same-instrument repeats included), as in UN-T3.
+
+    Rows are sorted by part once and each part is handled as a contiguous
+    slice. Parts larger than dense_limit use the equivalent interval test
+    m_i - U_i > m_j + U_j, counted with searchsorted; it is algebraically the
+    same inequality but may round differently for exact ties.
+
+    Returns {"n_pairs", "n_exceed"} and, with by_instrument=True, also
+    "instruments" plus upper-triangular "pairs"/"exceed" count matrices
+    indexed by instrument.
+    """
+    pcodes, _ = pd.factorize(part_id if isinstance(part_id, pd.Categorical) else pd.Series(part_id).to_numpy())
+    icodes, ilabels, missing = _factorize(instrument)
+    m, u = _float(measured), _float(U)
+
+    order = np.lexsort((icodes, pcodes))
+    order = order[pcodes[order] >= 0]
+    g, ic, m, u = pcodes[order], icodes[order], m[order], u[order]
+
+    k = len(ilabels)
+    mat_pairs = np.zeros((k, k), dtype=np.int64) if by_instrument else None
+    mat_exceed = np.zeros((k, k), dtype=np.int64) if by_instrument else None
+    n_pairs = n_exceed = 0
+
+    if len(g):
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        sizes = np.diff(np.r_[starts, len(g)])
+        # Like groupby().nunique(), a missing instrument id is not a distinct instrument
+        new_inst = np.r_[True, (g[1:] != g[:-1]) | (ic[1:] != ic[:-1])] & (ic != missing)
+        ninst = np.add.reduceat(new_inst.astype(np.int64), starts)
+        eligible = ninst >= 2
+        n_pairs = int((sizes[eligible] * (sizes[eligible] - 1) // 2).sum())
+
+        # Small parts: compare row r with row r+d for every offset d at once
+        small = eligible & (sizes <= small_group)
+        rows = np.repeat(small, sizes)
+        sg, sic, sm, su = g[rows], ic[rows], m[rows], u[rows]
+        for d in range(1, int(sizes[small].max()) if small.any() else 1):
+            same = sg[:-d] == sg[d:]
+            if not same.any():
+                break
+            ex = (np.abs(sm[:-d] - sm[d:]) > su[:-d] + su[d:])[same]
+            n_exceed += int(ex.sum())
+            if by_instrument:
+                _tally(mat_pairs, mat_exceed, sic[:-d][same], sic[d:][same], ex)
+
+        # Medium parts: full broadcast on the contiguous slice
+        for s, n in zip(starts[eligible & ~small & (sizes <= dense_limit)],
+                        sizes[eligible & ~small & (sizes <= dense_limit)]):
+            gm, gu, gi = m[s:s+n], u[s:s+n], ic[s:s+n]
+            iu, ju = np.triu_indices(n, k=1)
+            ex = (np.abs(gm[:, None] - gm[None, :]) > gu[:, None] + gu[None, :])[iu, ju]
+            n_exceed += int(ex.sum())
+            if by_instrument:
+                _tally(mat_pairs, mat_exceed, gi[iu], gi[ju], ex)
+
+        # Large parts: count disjoint uncertainty intervals without building pairs
+        for s, n in zip(starts[eligible & (sizes > dense_limit)], sizes[eligible & (sizes > dense_limit)]):
+            gm, gu, gi = m[s:s+n], u[s:s+n], ic[s:s+n]
+            a, b = gm - gu, gm + gu
+            self_hit = int((b < a).sum())  # only possible for negative U
+            if not by_instrument:
+                n_exceed += int(_count_disjoint(a, b, np.sort(b[~np.isnan(b)])).sum()) - self_hit
+                continue
+            insts = np.unique(gi)
+            bounds = np.searchsorted(gi, insts, side="left"), np.searchsorted(gi, insts, side="right")
+            ok = ~np.isnan(a)
+            for q, lo, hi in zip(insts, *bounds):
+                bq = b[lo:hi]
+                cnt = np.zeros(n, dtype=np.int64)
+                cnt[ok] = _count_disjoint(a, b, np.sort(bq[~np.isnan(bq)]))
+                cnt[lo:hi] -= (bq < a[lo:hi])
+                per_p = np.bincount(gi, weights=cnt, minlength=k).astype(np.int64)
+                for p in insts:
+                    mat_exceed[min(p, q), max(p, q)] += per_p[p]
+                n_exceed += int(cnt.sum())
+            counts = dict(zip(insts, bounds[1] - bounds[0]))
+            for p in insts:
+                for q in insts:
+                    if p < q:
+                        mat_pairs[p, q] += counts[p] * counts[q]
+                    elif p == q:
+                        mat_pairs[p, p] += counts[p] * (counts[p] - 1) // 2
+
+    out = {"n_pairs": n_pairs, "n_exceed": n_exceed}
+    if by_instrument:
+        out.update({"instruments": ilabels, "pairs": mat_pairs, "exceed": mat_exceed})
+    return out
+
+def instrument_pair_table(result):
+    """Flatten the by-instrument matrices of cross_instrument_pairs into JSON-friendly records."""
+    rows = []
+    labels, P, E = result["instruments"], result["pairs"], result["exceed"]
+    for i, j in zip(*np.nonzero(P)):
+        rows.append({
+            "instrument_a": labels[i], "instrument_b": labels[j],
+            "n_pairs": int(P[i, j]), "exceed_rate": float(E[i, j] / P[i, j]),
+        })
+    return rows
@@ -0,0 +1,170 @@
+import contextvars, os, time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+cProfile = tracemalloc = None  # imported by the first Profiler()
+
+_active: contextvars.ContextVar = contextvars.ContextVar("un_reanchor_profiler", default=None)
+
+class _Stage:
+    __slots__ = ("name", "rows", "t0", "mem0", "max_abs", "prof")
+
+    def __init__(self, name, rows):
+        self.name, self.rows = name, rows
+        self.max_abs = 0
+        self.prof = None
+
+class _NoStage:
+    """What stage() yields when no profiler is active; assignments are ignored."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NO_STAGE = _NoStage()
+
+class Profiler:
+    """
+    Per-stage wall time, rows/s and (with memory=True) peak traced memory.
+    Stages entered several times (e.g. once per chunk) are accumulated.
+
+    dump_dir writes <stage>.prof (cProfile, accumulated over calls) and, with
+    memory=True, <stage>.tracemalloc.txt (top allocation sites at the end of
+    the stage) for every stage. hooks are called as hook(name, record) after
+    each stage exits.
+
+        with profiling(Profiler(memory=True)) as prof:
+            run_all(df, cfg)
+        prof.timings()   # {"spec_limits": {"seconds": ..., "rows": ..., ...}, "UN-T1": ...}
+    """
+    def __init__(self, memory: bool = False, dump_dir: Optional[str] = None,
+                 hooks: Optional[List[Callable[[str, dict], None]]] = None):
+        global cProfile, tracemalloc
+        # imported here so that importing the package (and the CLI) stays cheap
+        import cProfile, tracemalloc
+        self.memory = memory
+        self.dump_dir = dump_dir
+        self.hooks = list(hooks or [])
+        self.records: Dict[str, dict] = {}
+        self._stack: List[_Stage] = []
+        self._profiles: Dict[str, "cProfile.Profile"] = {}
+        self._started_tracemalloc = False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        for name, prof in self._profiles.items():
+            prof.dump_stats(os.path.join(self.dump_dir, f"{_safe(name)}.prof"))
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        st = _Stage(name, rows)
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None and parent.prof is not None:
+            parent.prof.disable()  # only one cProfile can collect at a time
+        if self.memory:
+            st.mem0, peak_abs = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.max_abs = max(parent.max_abs, peak_abs)
+            tracemalloc.reset_peak()
+        if self.dump_dir:
+            st.prof = self._profiles.setdefault(name, cProfile.Profile())
+        self._stack.append(st)
+        st.t0 = time.perf_counter()
+        if st.prof is not None:
+            st.prof.enable()
+        try:
+            yield st
+        finally:
+            if st.prof is not None:
+                st.prof.disable()
+            seconds = time.perf_counter() - st.t0
+            self._stack.pop()
+            peak = None
+            if self.memory:
+                peak_abs = max(tracemalloc.get_traced_memory()[1], st.max_abs)
+                peak = max(peak_abs - st.mem0, 0)
+                if parent is not None:
+                    # reset_peak() above hid this stage's peak from the parent
+                    parent.max_abs = max(parent.max_abs, peak_abs)
+                if self.dump_dir:
+                    _dump_tracemalloc(os.path.join(self.dump_dir, f"{_safe(name)}.tracemalloc.txt"))
+            self._record(name, seconds, st.rows, peak)
+            if parent is not None and parent.prof is not None:
+                parent.prof.enable()
+
+    def _record(self, name, seconds, rows, peak):
+        rec = self.records.setdefault(name, {"seconds": 0.0, "rows": None, "calls": 0})
+        rec["seconds"] += seconds
+        rec["calls"] += 1
+        if rows is not None:
+            rec["rows"] = (rec["rows"] or 0) + int(rows)
+        if peak is not None:
+            rec["peak_mb"] = max(rec.get("peak_mb", 0.0), peak / 2**20)
+        for hook in self.hooks:
+            hook(name, rec)
+
+    def timings(self) -> Dict[str, dict]:
+        """The `timings` block: seconds, rows, rows_per_s, calls and peak_mb per stage."""
+        out = {}
+        for name, rec in self.records.items():
+            r = dict(rec)
+            r["rows_per_s"] = r["rows"] / r["seconds"] if r["rows"] and r["seconds"] else None
+            out[name] = r
+        return out
+
+    def summary(self) -> str:
+        parts = []
+        for name, r in self.timings().items():
+            s = f"{name} {r['seconds']:.3f}s"
+            if r["rows_per_s"]:
+                s += f" ({r['rows_per_s']:,.0f} rows/s)"
+            if "peak_mb" in r:
+                s += f" {r['peak_mb']:.1f}MiB"
+            parts.append(s)
+        return ", ".join(parts)
+
+def _safe(name):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+def _dump_tracemalloc(path, limit=25):
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    with open(path, "w") as f:
+        f.write("\n".join(str(s) for s in stats) + "\n")
+
+@contextmanager
+def profiling(profiler: Optional[Profiler] = None):
+    """Make `profiler` (a new one by default) receive every stage() in this context."""
+    profiler = profiler or Profiler()
+    token = _active.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active.reset(token)
+
+def active() -> Optional[Profiler]:
+    return _active.get()
+
+def stage(name: str, rows: Optional[int] = None):
+    """Instrument a block as `name`; a no-op unless a profiler is active."""
+    prof = _active.get()
+    return _NO_STAGE if prof is None else prof.stage(name, rows)
@@ -0,0 +1,104 @@
+"""
+Resampling engines for uncertainty on the reported rates: nonparametric
+bootstrap confidence intervals (UN-T1..UN-T6 rates) and Monte-Carlo
+propagation of expanded uncertainties through UN-CT1 `holds`. NumPy only,
+seeded so that the same settings always give the same intervals.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+MAX_ELEMS = 1 << 22           # random numbers generated per step (bounds memory)
+MC_BLOCK = (256, 4096)        # (draws, rows) per Monte-Carlo block; fixes the draws independently of workers
+
+def settings(params):
+    """Resampling settings from config params; None entries mean "off"."""
+    params = params or {}
+    return {"bootstrap_n": int(params.get("bootstrap_n") or 0), "mc_draws": int(params.get("mc_draws") or 0),
+            "level": float(params.get("ci_level") or 0.95), "seed": int(params.get("seed") or 0),
+            "coverage_k": float(params.get("coverage_k") or 2.0), "workers": int(params.get("resample_workers") or 0)}
+
+def percentile_ci(samples, level):
+    """Percentile interval [lo, hi] over replicates (NaN replicates ignored); None if there are none."""
+    samples = np.asarray(samples, dtype=float)
+    samples = samples[~np.isnan(samples)]
+    if not len(samples):
+        return None
+    a = (1.0 - level) / 2
+    return [float(q) for q in np.quantile(samples, [a, 1.0 - a])]
+
+def bootstrap_counts(counts, n_boot, rng, max_elems=MAX_ELEMS):
+    """
+    Yield (b, T) blocks of bootstrap type counts for units of T types
+    (counts[t] units of type t). Drawing n units with replacement only
+    matters through how many of each type are drawn, which is
+    Multinomial(n, counts / n): the same distribution as resampling an
+    (n_boot, n) index matrix, at O(n_boot * T) instead of O(n_boot * n).
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n = int(counts.sum())
+    step = max(1, max_elems // max(len(counts), 1))
+    for lo in range(0, n_boot, step):
+        b = min(step, n_boot - lo)
+        yield rng.multinomial(n, counts / n, size=b) if n else np.zeros((b, len(counts)), dtype=np.int64)
+
+def bootstrap_rates(counts, rates, n_boot, level, rng, max_elems=MAX_ELEMS):
+    """
+    Percentile CIs of ratio statistics over typed units. `rates` maps a name
+    to (num, den) boolean masks over the types; each replicate's rate is
+    (# drawn units in num) / (# drawn units in den), every rate being
+    evaluated on the same resampled units.
+    """
+    names = list(rates)
+    num = np.array([rates[k][0] for k in names], dtype=np.int64).T
+    den = np.array([rates[k][1] for k in names], dtype=np.int64).T
+    out = []
+    for block in bootstrap_counts(counts, n_boot, rng, max_elems):
+        d = block @ den
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out.append(np.where(d > 0, (block @ num) / np.maximum(d, 1), np.nan))
+    samples = np.concatenate(out) if out else np.empty((0, len(names)))
+    return {k: percentile_ci(samples[:, j], level) for j, k in enumerate(names)}
+
+def _mc_blocks(args):
+    h0, sd_h0, a_val, sd_a, rhs, n_draws, seed, blocks = args
+    db, rb = MC_BLOCK
+    n, k = rhs.shape
+    hold_counts = np.zeros((n_draws, k), dtype=np.int64)
+    p_sum = np.zeros((n, k), dtype=np.int64)
+    for i in blocks:
+        d0, d1 = i * db, min((i + 1) * db, n_draws)
+        a = a_val + np.random.default_rng([seed, 1, i]).standard_normal((d1 - d0, k)) * sd_a
+        for j, r0 in enumerate(range(0, n, rb)):
+            r1 = min(r0 + rb, n)
+            h = h0[r0:r1] + np.random.default_rng([seed, 2, i, j]).standard_normal((d1 - d0, r1 - r0)) * sd_h0[r0:r1]
+            holds = np.abs(h[:, :, None] - a[:, None, :]) <= rhs[None, r0:r1]
+            hold_counts[d0:d1] += holds.sum(axis=1)
+            p_sum[r0:r1] += holds.sum(axis=0)
+    return hold_counts, p_sum
+
+def ct1_monte_carlo(h0, U, anchor_value, anchor_U, rhs, n_draws, coverage_k=2.0, seed=0, workers=0):
+    """
+    Monte-Carlo propagation of the expanded uncertainties through UN-CT1:
+    each draw perturbs every H0 by N(0, (U/k)^2) and each anchor value by
+    N(0, (u/k)^2) (one anchor draw shared by all rows) and re-evaluates
+    |H0 - anchor| <= rhs. Returns (p_holds per row and anchor, holds count
+    per draw and anchor).
+
+    Draws are generated in fixed (draws, rows) blocks, each with its own
+    seed, so memory stays bounded and the result does not depend on
+    `workers`; workers > 1 spreads the draw blocks over a process pool.
+    """
+    h0, sd_h0 = np.asarray(h0, dtype=float), np.asarray(U, dtype=float) / coverage_k
+    a_val, sd_a = np.asarray(anchor_value, dtype=float), np.asarray(anchor_U, dtype=float) / coverage_k
+    n_blocks = -(-n_draws // MC_BLOCK[0])
+    tasks = [(h0, sd_h0, a_val, sd_a, rhs, n_draws, seed, range(w, n_blocks, max(workers, 1)))
+             for w in range(min(max(workers, 1), n_blocks))]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as ex:
+            parts = list(ex.map(_mc_blocks, tasks))
+    else:
+        parts = [_mc_blocks(t) for t in tasks]
+    hold_counts = sum(p[0] for p in parts)
+    p_sum = sum(p[1] for p in parts)
+    return p_sum / n_draws, hold_counts
@@ -0,0 +1,186 @@
+"""
+Content-addressed cache of validation results. Entries are keyed by the
+SHA-256 of the input file, the parts of the config a result depends on
+(normalized: defaults filled in, keys sorted), the resolved UHA anchors and
+the package code (version plus a hash of its sources, so edits to an
+editable install miss), so an identical re-run reads report.json entries,
+decisions and UN-CT1 results back instead of recomputing them.
+
+Metrology reports are cached per test: each UN-T* entry is keyed only by
+the columns and the params it reads (TEST_PARAMS), so e.g. changing gamma
+recomputes UN-T2 and UN-T5 and reuses the other four tests.
+
+The cache lives in $UNREANCHOR_RESULT_CACHE (default
+<UNREANCHOR_CACHE_DIR or ~/.unreanchor_cache>/results); "off" disables it.
+Least recently used entries are evicted beyond
+$UNREANCHOR_RESULT_CACHE_MAX_BYTES (default 2 GiB).
+"""
+import functools, hashlib, json, os, shutil, tempfile, time
+from .cacheindex import evict, locked_index
+
+# params each test reads besides the column mapping
+TEST_PARAMS = {
+    "UN-T1": ("coverage_k",),
+    "UN-T2": ("coverage_k", "gamma"),
+    "UN-T3": ("coverage_k", "by_instrument_pair", "low_memory"),
+    "UN-T4": ("calibration_cut", "calibration_cuts", "calibration_events", "drift_window", "drift_step", "low_memory"),
+    "UN-T5": ("coverage_k", "gamma", "edge_delta"),
+    "UN-T6": ("coverage_k",),
+}
+_BOOTSTRAP_PARAMS = ("bootstrap_n", "ci_level", "seed")
+_MC_PARAMS = ("mc_draws", "coverage_k", "ci_level", "seed")
+# values the code falls back to when a param is missing (see un_validation / resampling)
+_DEFAULTS = {"coverage_k": 2.0, "gamma": 1.0, "edge_delta": 0.1, "ci_level": 0.95, "bootstrap_n": 0, "mc_draws": 0,
+             "seed": 0, "low_memory": False, "by_instrument_pair": False}
+_DEFAULT_MAX_BYTES = 2 * 1024**3
+
+def source_digest(pkg_dir):
+    """SHA-256 over the names and contents of the .py files in pkg_dir."""
+    h = hashlib.sha256()
+    for name in sorted(n for n in os.listdir(pkg_dir) if n.endswith(".py")):
+        h.update(name.encode() + b"\0")
+        with open(os.path.join(pkg_dir, name), "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def _version():
+    """Package version plus a digest of its sources: an edited editable install gets new keys."""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        v = version("un-algebra-reanchor")
+    except PackageNotFoundError:
+        v = "unknown"
+    return f"{v}+{source_digest(os.path.dirname(os.path.abspath(__file__)))[:16]}"
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+def file_sha256(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(block):
+            h.update(chunk)
+    return h.hexdigest()
+
+def normalized_params(params, names):
+    params = params or {}
+    out = {}
+    for k in names:
+        v = params.get(k)
+        if v is None:
+            v = _DEFAULTS.get(k)
+        elif isinstance(_DEFAULTS.get(k), float):
+            v = float(v)
+        elif isinstance(_DEFAULTS.get(k), bool):
+            v = bool(v)
+        out[k] = v
+    return out
+
+def report_keys(data_sha, cfg, decisions_format="csv"):
+    """
+    Cache keys of one metrology run: one per test, "decisions" (the UN-T2
+    inputs plus the file format) and "extras" (report blocks besides the
+    tests, e.g. low_memory / bootstrap, keyed by every param). With
+    bootstrap_n > 0 the intervals couple all tests, so every key covers
+    every param.
+    """
+    params = cfg.get("params") or {}
+    base = {"version": _version(), "data": data_sha, "columns": cfg.get("columns") or {}}
+    every = sorted({k for names in TEST_PARAMS.values() for k in names} | set(_BOOTSTRAP_PARAMS))
+    if params.get("calibration_events"):
+        base["calibration_events"] = file_sha256(params["calibration_events"])
+    coupled = bool(params.get("bootstrap_n"))
+    keys = {t: _digest({**base, "entry": t, "params": normalized_params(params, every if coupled else names)})
+            for t, names in TEST_PARAMS.items()}
+    keys["decisions"] = _digest({**base, "entry": "decisions", "format": decisions_format,
+                                 "params": normalized_params(params, every if coupled else TEST_PARAMS["UN-T2"])})
+    keys["extras"] = _digest({**base, "entry": "extras", "params": normalized_params(params, every)})
+    return keys
+
+def ct1_key(data_sha, anchors, params):
+    """Cache key of a UN-CT1 run: data, resolved anchor JSON and the Monte-Carlo settings."""
+    return _digest({"version": _version(), "data": data_sha, "entry": "UN-CT1", "anchors": anchors,
+                    "params": normalized_params(params, _MC_PARAMS)})
+
+class ResultCache:
+    """
+    JSON entries and files under root/<key[:2]>/<key>.<ext>, written
+    atomically; root/index.json tracks sizes and last access for LRU
+    eviction beyond `max_bytes`.
+    """
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = int(os.getenv("UNREANCHOR_RESULT_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES)) if max_bytes is None else max_bytes
+
+    @classmethod
+    def from_env(cls):
+        """The default cache, or None when $UNREANCHOR_RESULT_CACHE is "off"."""
+        root = os.getenv("UNREANCHOR_RESULT_CACHE", "")
+        if root.strip().lower() in ("off", "0", "false", "no"):
+            return None
+        if not root:
+            root = os.path.join(os.path.expanduser(os.getenv("UNREANCHOR_CACHE_DIR", "~/.unreanchor_cache")), "results")
+        return cls(root)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def _touch(self, path):
+        """Record an access to `path` in the index and evict beyond max_bytes."""
+        name = os.path.relpath(path, self.root)
+        with locked_index(self.root) as idx:
+            try:
+                idx[name] = {"file": name, "size": os.path.getsize(path), "last_access": time.time()}
+            except OSError:  # evicted by a concurrent run
+                idx.pop(name, None)
+            evict(idx, name, self.max_bytes, self.root)
+
+    def _publish(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._touch(path)
+
+    def data_sha(self, path):
+        """SHA-256 of a data file, memoized by (path, size, mtime) so unchanged inputs are not re-read."""
+        st = os.stat(path)
+        stat_key = _digest([os.path.realpath(path), st.st_size, st.st_mtime_ns])
+        memo = self.load(stat_key)
+        if memo is None:
+            memo = {"sha256": file_sha256(path)}
+            self.store(stat_key, memo)
+        return memo["sha256"]
+
+    def load(self, key):
+        path = self._path(key, "json")
+        try:
+            with open(path) as f:
+                obj = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(path)
+        return obj
+
+    def store(self, key, obj):
+        self._publish(self._path(key, "json"), lambda f: f.write(json.dumps(obj, indent=1).encode()))
+
+    def fetch_file(self, key, dest):
+        """Copy a cached file to dest; False if there is none."""
+        path = self._path(key, "blob")
+        try:
+            shutil.copyfile(path, dest)
+        except OSError:
+            return False
+        self._touch(path)
+        return True
+
+    def store_file(self, key, src):
+        with open(src, "rb") as s:
+            self._publish(self._path(key, "blob"), lambda f: shutil.copyfileobj(s, f))
@@ -0,0 +1,291 @@
+import errno, hashlib, json, os, socket, socketserver, stat, tempfile, threading, time, urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import yaml
+from .un_validation import run_all
+from .un_ct1 import un_CT1_cosmology
+from .dataio import inspect_input
+from .cli import _run_generic, _run_un_ct1
+from .net import fetch_to_cache, is_remote
+from .uha import resolve_uha_address
+
+_UPLOAD_SUFFIX = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+_MAX_UPLOAD = 256 << 20  # request body bytes
+
+class ServiceError(ValueError):
+    """A request the service rejects; `status` is the HTTP status to answer with."""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class _Memo:
+    """Thread-safe LRU memo with an optional time-to-live (seconds) per entry."""
+    def __init__(self, maxsize=64, ttl=None):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and (not self.ttl or now - hit[0] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+        value = compute()  # outside the lock: resolving an anchor may hit the network
+        with self._lock:
+            self._data[key] = (now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+def _uha_addresses(uha):
+    if isinstance(uha, (list, tuple)):
+        return list(uha)
+    return [a.strip() for a in (uha or "").split(",") if a.strip()]
+
+class ValidationService:
+    """
+    Warm in-process validator: parsed configs and resolved UHA anchors are
+    memoized (LRU, anchors with a TTL) and requests run run_all /
+    un_CT1_cosmology on a thread pool of `workers`.
+
+    `data_root`, when set, is the only directory the local paths of a
+    request (data, config, `out`, file anchors) may name, and remote data or
+    anchor addresses are refused unless `allow_remote`; remote URLs go
+    through the shared download cache. Request bodies above `max_upload`
+    bytes are refused.
+    """
+    def __init__(self, default_config=None, workers=None, cache_size=64, anchor_ttl=3600, data_root=None,
+                 max_upload=_MAX_UPLOAD, allow_remote=False):
+        self.default_config = default_config
+        self.data_root = os.path.realpath(data_root) if data_root else None
+        self.allow_remote = allow_remote or not data_root
+        self.max_upload = max_upload
+        self.configs = _Memo(cache_size)
+        self.anchors = _Memo(cache_size, anchor_ttl)
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="unreanchor-worker")
+
+    def config(self, spec=None):
+        """A config from a dict, YAML text or a path; paths are memoized by (path, mtime)."""
+        trusted = spec is None  # the service's own --config may live outside data_root
+        spec = spec if spec is not None else self.default_config
+        if spec is None:
+            raise ServiceError("No config given and the service has no default --config")
+        if isinstance(spec, dict):
+            return spec
+        if "\n" in spec or spec.lstrip().startswith("{"):
+            return self.configs.get(("text", hashlib.sha256(spec.encode()).hexdigest()), lambda: yaml.safe_load(spec))
+        path = os.path.abspath(spec) if trusted else self._confine(spec)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise ServiceError(f"Config not found: {spec}", 404)
+        def load():
+            with open(path) as f:
+                return yaml.safe_load(f)
+        return self.configs.get(("path", path, mtime), load)
+
+    def resolve_anchors(self, uha):
+        addresses = _uha_addresses(uha)
+        if not addresses:
+            raise ServiceError("H0 dataset detected but no 'uha' address was given")
+        return [a if isinstance(a, dict) else self.anchors.get(a, lambda a=a: self._resolve_anchor(a)) for a in addresses]
+
+    def _resolve_anchor(self, address):
+        if address.startswith(("http://", "https://", "zenodo:", "doi:")):
+            self._check_remote(address)
+        else:
+            self._confine(address[5:] if address.startswith("file:") else address)
+        return resolve_uha_address(address)
+
+    def _confine(self, name):
+        """Real path of a local path from a request; 403 when it leaves data_root."""
+        path = os.path.realpath(name)
+        if self.data_root and os.path.commonpath([path, self.data_root]) != self.data_root:
+            raise ServiceError(f"{name} is outside the service data root", 403)
+        return path
+
+    def _check_remote(self, address):
+        # with a data root, the server only fetches URLs it was told to (--allow-remote)
+        if not self.allow_remote:
+            raise ServiceError(f"{address}: remote addresses are disabled on this service (see --allow-remote)", 403)
+
+    def _local_path(self, data):
+        if is_remote(data):
+            self._check_remote(data)
+            return fetch_to_cache(data)
+        path = self._confine(data)
+        if not os.path.exists(path):
+            raise ServiceError(f"Dataset not found: {data}", 404)
+        return path
+
+    def validate(self, data, config=None, uha="", out=None):
+        """
+        Validate one dataset (path or URL) and return (kind, result): the
+        report.json dict for metrology data, the UN-CT1 summary for H0 tables.
+        With `out`, report/decisions files are written there as by `run`.
+        """
+        return self._validate(self._local_path(data), config, uha, out)
+
+    def _validate(self, path, config, uha, out):
+        out = self._confine(out) if out else out
+        cfg = None if config is None and self.default_config is None else self.config(config)
+        inp = inspect_input(path, cfg)
+        if inp.kind == "h0":
+            anchors = self.resolve_anchors(uha)
+            params = (cfg or {}).get("params")
+            if out:
+                return "h0", _run_un_ct1(inp.read(), out, ",".join(_uha_addresses(uha)), anchors, params)
+            summary, _ = un_CT1_cosmology(inp.read(), anchors if len(anchors) > 1 else anchors[0], params)
+            return "h0", summary
+        if out:
+            return "metrology", _run_generic(inp, cfg, out)
+        report, _ = run_all(inp.read(), cfg)
+        return "metrology", report
+
+    def validate_upload(self, body: bytes, fmt="csv", config=None, uha="", out=None):
+        """Validate an uploaded file body; it is spooled to a temporary file for the single-parse input stage."""
+        if fmt not in _UPLOAD_SUFFIX:
+            raise ServiceError(f"Unsupported upload format {fmt!r}; use one of {sorted(_UPLOAD_SUFFIX)}")
+        fd, path = tempfile.mkstemp(suffix=_UPLOAD_SUFFIX[fmt], prefix="unreanchor-upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            return self._validate(path, config, uha, out)
+        finally:
+            os.unlink(path)
+
+    def submit(self, fn, *args, **kw):
+        return self.pool.submit(fn, *args, **kw)
+
+    def stats(self):
+        return {"configs": self.configs.stats(), "anchors": self.anchors.stats()}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "unreanchor"
+
+    def setup(self):
+        # Headers and body go out in separate writes; without TCP_NODELAY, keep-alive
+        # clients wait out a delayed ACK (~40 ms) on every response
+        self.disable_nagle_algorithm = self.request.family in (socket.AF_INET, socket.AF_INET6)
+        super().setup()
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, obj, headers=None):
+        body = json.dumps(obj, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/health":
+            self._send(200, {"status": "ok", "cache": self.server.service.stats()})
+        else:
+            self._send(404, {"error": f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/validate":
+            self._send(404, {"error": f"Unknown endpoint {url.path}"})
+            return
+        if "Content-Length" not in self.headers:
+            self._send(411, {"error": "Content-Length required"})
+            return
+        service = self.server.service
+        try:
+            length = int(self.headers["Content-Length"])
+        except ValueError:
+            length = -1
+        if length < 0 or length > service.max_upload:
+            self.close_connection = True  # the body is left unread
+            if length < 0:
+                self._send(400, {"error": "Invalid Content-Length"})
+            else:
+                self._send(413, {"error": f"Request body over the {service.max_upload} byte limit"})
+            return
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Type", "").split(";")[0].strip() == "application/json":
+                req = json.loads(body or b"{}")
+                if not isinstance(req, dict) or not req.get("data"):
+                    raise ServiceError("JSON body must be an object with a 'data' path or URL")
+                future = service.submit(service.validate, req["data"], req.get("config"), req.get("uha", ""), req.get("out"))
+            else:
+                # Raw dataset upload; options come from the query string
+                q = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+                future = service.submit(service.validate_upload, body, q.get("format", "csv"), config=q.get("config"),
+                                        uha=q.get("uha", ""), out=q.get("out"))
+            kind, result = future.result()
+        except ServiceError as e:
+            self._send(e.status, {"error": str(e)})
+        except (ValueError, KeyError, yaml.YAMLError) as e:
+            self._send(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, result, {"X-Unreanchor-Kind": kind})
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        try:
+            mode = os.lstat(self.server_address).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(errno.EEXIST, "Not a socket; refusing to replace it", self.server_address)
+            os.unlink(self.server_address)  # stale socket from an earlier run
+        super().server_bind()
+        self.server_name, self.server_port = "localhost", 0
+
+def make_server(service, host="127.0.0.1", port=8765, socket_path=None, quiet=False):
+    """HTTP server for `service` on host:port, or on a Unix socket when socket_path is set."""
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise SystemExit("Unix sockets are not available on this platform")
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.service, server.quiet = service, quiet
+    return server
+
+def serve(service, host="127.0.0.1", port=8765, socket_path=None, quiet=False):
+    server = make_server(service, host, port, socket_path, quiet)
+    where = socket_path or "http://%s:%d" % server.server_address[:2]
+    print(f"unreanchor serve listening on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
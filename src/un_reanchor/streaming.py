@@ -0,0 +1,383 @@
+import hashlib, json, math, os, tempfile
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+from .un_validation import (
+    DECISION_LABELS, INDETERMINATE, prepare_frame, _guard_band_decisions, _tallies_from_counts,
+    _archival_agreement, _t1_covered, _t6_covered, _edge_mask, _calibration_split,
+    _exact_sum, _delta_mean, _row_type_counts, add_bootstrap_cis, N_ROW_TYPES,
+)
+from .resampling import settings as resample_settings
+from .pairing import cross_instrument_pairs
+from .drift import drift_plan, drift_partials, drift_report, merge_partials
+from .dataio import DecisionWriter
+from .profiling import stage
+
+STATE_VERSION = 2
+# UN-T3 rows buffered in memory before they are spilled to part-hash bucket files
+_SPILL_ROWS = 1 << 22
+_SPILL_BUCKETS = 64
+_SPILL_DTYPE = np.dtype([("p", np.int64), ("i", np.int64), ("m", np.float64), ("u", np.float64)])
+
+class _Interner:
+    """
+    Stable integer codes for labels seen across chunks (missing values -> -1).
+    With dtype=str labels are interned as text, so an id parsed as 5 in one
+    chunk and "5" in another gets one code.
+    """
+    def __init__(self, labels=(), dtype=None):
+        self.dtype = dtype
+        self.labels = [v if dtype is None or v is None else dtype(v) for v in labels]
+        self.codes = {v: c for c, v in enumerate(self.labels)}
+
+    def encode(self, values):
+        s = pd.Series(values)
+        missing = s.isna().to_numpy()
+        if self.dtype is not None:
+            s = s.astype(object).where(missing, s.astype(self.dtype))
+        for v in pd.unique(s[~missing]):
+            if v not in self.codes:
+                self.codes[v] = len(self.labels)
+                self.labels.append(v.item() if isinstance(v, np.generic) else v)
+        out = np.full(len(s), -1, dtype=np.int64)
+        if (~missing).any():
+            out[~missing] = s[~missing].map(self.codes).to_numpy(dtype=np.int64)
+        return out
+
+    def translate(self, codes, other):
+        """Re-express codes of `other` (another interner) in this one."""
+        codes = np.asarray(codes, dtype=np.int64)
+        if not len(codes):
+            return codes
+        table = self.encode(list(other.labels) + [None])  # the trailing None maps other's -1
+        return table[codes]
+
+def _nan_codes(codes):
+    # pairing treats NaN as "missing"; -1 would be a real label to pd.factorize
+    return np.where(codes < 0, np.nan, codes.astype(float))
+
+def config_fingerprint(cfg):
+    """Hash of the config; a saved state may only be resumed with the same one."""
+    return hashlib.sha256(json.dumps(cfg, sort_keys=True, default=str).encode()).hexdigest()
+
+def _fraction_str(x):
+    return f"{x.numerator}/{x.denominator}"
+
+class StreamingValidator:
+    """
+    Chunked equivalent of run_all. UN-T1, UN-T2, UN-T5 and UN-T6 are kept as
+    running counts, UN-T4 as before/after running sums (and mergeable
+    drift_partials for per-instrument cuts and drift windows), and decisions are
+    appended to decisions_path (CSV, or Parquet by extension) as each chunk
+    arrives.
+
+    UN-T3 needs every measurement of a part, so (part, instrument, measured, U)
+    is buffered as compact arrays until result(). Beyond `spill_rows` buffered
+    rows they are appended to part-hash bucket files in a temporary directory,
+    and result() pairs one bucket at a time, so memory is bounded by
+    spill_rows and the largest bucket (1/64 of the rows) rather than by the
+    file. Set params.parts_contiguous when rows of a part are never split by
+    other parts: completed parts are then paired and dropped after each chunk,
+    bounding memory by chunk size.
+
+    Reports match run_all exactly: UN-T4 sums are kept as exact fractions, so
+    delta_mean does not depend on how the rows were chunked.
+
+    With keep_history=True the UN-T3 rows stay available after counting, so
+    the validator can be saved (save_state) and resumed on rows appended
+    later (load_state): pairs between old and new rows of a part are added
+    as pairs(old + new) - pairs(old). With parts_contiguous only the last
+    part, which may still continue, is kept.
+    """
+    def __init__(self, cfg, decisions_path=None, keep_history=False, spill_rows=None):
+        self.cfg = cfg
+        self.keep_history = keep_history
+        self.by_inst = bool(cfg["params"].get("by_instrument_pair", False))
+        self.contiguous = bool(cfg["params"].get("parts_contiguous", False))
+        self.cut = cfg["params"].get("calibration_cut")
+        self.n = 0
+        self.decision_counts = np.zeros(len(DECISION_LABELS), dtype=np.int64)
+        self.t1 = [0, 0]          # n with true value, covered
+        self.t6 = [0, 0]
+        self.t5 = [0, 0]          # n near edge, indeterminate among them
+        self.agree = None         # [hits, determinate rows] once an accepted column is seen
+        self.bootstrap = bool(resample_settings(cfg["params"])["bootstrap_n"])
+        self.row_types = np.zeros(N_ROW_TYPES, dtype=np.int64)  # bootstrap row-type counts
+        # before_n, finite before values, their exact sum, then the same after the cut
+        self.t4 = [0, 0, Fraction(0), 0, 0, Fraction(0)]
+        self.t4_plan = drift_plan(cfg)
+        self.t4_parts = {}        # drift_partials keys -> [n, exact sum] (per-instrument cuts, drift windows)
+        self.has_instrument = False
+        self.parts, self.instruments = _Interner(dtype=str), _Interner()
+        self._buf = []            # pending (part, instrument, measured, U) chunks for UN-T3
+        self._buf_rows = 0
+        self.spill_rows = _SPILL_ROWS if spill_rows is None else spill_rows
+        self._spill_dir = None    # TemporaryDirectory of bucket files once _buf has been spilled
+        self._hist = _empty_rows()  # already counted UN-T3 rows kept for resuming
+        self.t3_pairs = self.t3_exceed = 0
+        self.t3_matrix = {}       # (inst_a, inst_b) codes -> [pairs, exceed]
+        self._dec = DecisionWriter(decisions_path) if decisions_path else None
+        self.meta = {}            # metadata of the state this validator was resumed from
+
+    def update(self, df):
+        vf = prepare_frame(df, self.cfg)
+        n = vf.n
+        with stage("UN-T2", n):
+            codes = _guard_band_decisions(vf, self.cfg)
+            self.n += n
+            self.decision_counts += np.bincount(codes, minlength=len(DECISION_LABELS))
+            if vf.accepted is not None:
+                hits = _archival_agreement(vf.accepted, codes)
+                self.agree = self.agree or [0, 0]
+                self.agree[0] += int(hits.sum()); self.agree[1] += len(hits)
+        if self._dec is not None:
+            with stage("write_decisions", n):
+                self._dec.write(codes)
+        with stage("UN-T1", n):
+            covered = _t1_covered(vf)
+            self.t1[0] += len(covered); self.t1[1] += int(covered.sum())
+        with stage("UN-T6", n):
+            covered = _t6_covered(vf)
+            self.t6[0] += len(covered); self.t6[1] += int(covered.sum())
+        with stage("UN-T5", n):
+            near = _edge_mask(vf, self.cfg)
+            self.t5[0] += int(near.sum()); self.t5[1] += int((codes[near] == INDETERMINATE).sum())
+        if self.cut and vf.timestamp is not None:
+            with stage("UN-T4", n):
+                is_before, is_after = _calibration_split(vf, self.cut)
+                for i, rows in ((0, is_before), (3, is_after)):
+                    m = vf.measured[rows]
+                    self.t4[i] += len(m); self.t4[i + 1] += int(np.isfinite(m).sum()); self.t4[i + 2] += _exact_sum(m)
+        if self.t4_plan is not None and vf.timestamp is not None:
+            with stage("UN-T4", n):
+                merge_partials(self.t4_parts, drift_partials(vf.timestamp_ns, vf.instrument_id, vf.part_family,
+                                                             vf.measured, self.t4_plan))
+        if self.bootstrap:
+            with stage("bootstrap", n):
+                self.row_types += _row_type_counts(vf, self.cfg, codes)
+        if vf.instrument_id is not None:
+            with stage("UN-T3", n):
+                self.has_instrument = True
+                p = self.parts.encode(vf.part_id)
+                keep = p >= 0
+                self._buf.append((p[keep], self.instruments.encode(vf.instrument_id)[keep], vf.measured[keep], vf.U[keep]))
+                self._buf_rows += int(keep.sum())
+                if self.contiguous:
+                    self._flush_parts(final=False)
+                elif self._buf_rows > self.spill_rows:
+                    self._spill()
+        return codes
+
+    def merge(self, other):
+        """
+        Fold a finished partial validator into this one. For UN-T3 to stay
+        exact the two must have seen disjoint sets of parts (e.g. part_id
+        hash shards). Decisions are not merged; the caller owns row order.
+        """
+        self._flush_parts(final=True)
+        other._flush_parts(final=True)
+        self.n += other.n
+        self.decision_counts += other.decision_counts
+        for mine, theirs in ((self.t1, other.t1), (self.t6, other.t6), (self.t5, other.t5), (self.t4, other.t4)):
+            for i, v in enumerate(theirs):
+                mine[i] += v
+        merge_partials(self.t4_parts, other.t4_parts)
+        self.row_types += other.row_types
+        if other.agree:
+            self.agree = [a + b for a, b in zip(self.agree or [0, 0], other.agree)]
+        self.has_instrument |= other.has_instrument
+        if self.keep_history and len(other._hist[0]):
+            p, i, m, u = other._hist
+            theirs = (self.parts.translate(p, other.parts), self.instruments.translate(i, other.instruments), m, u)
+            self._hist = tuple(np.concatenate(c) for c in zip(self._hist, theirs))
+        self.t3_pairs += other.t3_pairs
+        self.t3_exceed += other.t3_exceed
+        for (a, b), (n, e) in other.t3_matrix.items():
+            ca, cb = (self.instruments.encode([other.instruments.labels[c] if c >= 0 else None])[0] for c in (a, b))
+            key = tuple(sorted((int(ca), int(cb)), key=lambda c: (c < 0, c)))
+            slot = self.t3_matrix.setdefault(key, [0, 0])
+            slot[0] += n; slot[1] += e
+        return self
+
+    def _spill(self):
+        """Append the buffered UN-T3 rows to their part-hash bucket files."""
+        p, i, m, u = (np.concatenate(c) for c in zip(*self._buf))
+        self._buf, self._buf_rows = [], 0
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="unreanchor-t3-")
+        rows = np.empty(len(p), dtype=_SPILL_DTYPE)
+        rows["p"], rows["i"], rows["m"], rows["u"] = p, i, m, u
+        bucket = p % _SPILL_BUCKETS
+        order = np.argsort(bucket, kind="stable")
+        bounds = np.searchsorted(bucket[order], np.arange(_SPILL_BUCKETS + 1))
+        for b in np.flatnonzero(np.diff(bounds)):
+            with open(os.path.join(self._spill_dir.name, f"{b}.bin"), "ab") as f:
+                rows[order[bounds[b]:bounds[b + 1]]].tofile(f)
+
+    def _flush_spilled(self):
+        """Pair spilled rows bucket by bucket; a part's rows are all in one bucket."""
+        if self._buf:
+            self._spill()
+        spill_dir, self._spill_dir = self._spill_dir, None
+        with spill_dir:
+            for b in range(_SPILL_BUCKETS):
+                path = os.path.join(spill_dir.name, f"{b}.bin")
+                if os.path.exists(path):
+                    rows = np.fromfile(path, dtype=_SPILL_DTYPE)
+                    self._buf = [tuple(np.ascontiguousarray(rows[f]) for f in _SPILL_DTYPE.names)]
+                    self._flush_parts(final=True)
+
+    def _flush_parts(self, final):
+        if final and self._spill_dir is not None:
+            return self._flush_spilled()
+        if not self._buf:
+            return
+        p, i, m, u = (np.concatenate(c) for c in zip(*self._buf))
+        self._buf, self._buf_rows = [], 0
+        if not final and len(p):
+            # The last part may continue in the next chunk; keep it buffered
+            tail = p == p[-1]
+            self._buf.append((p[tail], i[tail], m[tail], u[tail]))
+            self._buf_rows = int(tail.sum())
+            done = ~tail
+            p, i, m, u = p[done], i[done], m[done], u[done]
+        if not len(p):
+            return
+        seen = np.isin(self._hist[0], np.unique(p)) if len(self._hist[0]) else None
+        if seen is not None and seen.any():
+            # Some parts already have counted rows: count old + new, minus old
+            old = tuple(c[seen] for c in self._hist)
+            self._count_pairs(*(np.concatenate(c) for c in zip(old, (p, i, m, u))))
+            self._count_pairs(*old, sign=-1)
+        else:
+            self._count_pairs(p, i, m, u)
+        if self.keep_history:
+            self._hist = tuple(np.concatenate(c) for c in zip(self._hist, (p, i, m, u)))
+            if self.contiguous:
+                # earlier parts are complete; only the last one can continue
+                last = self._hist[0] == p[-1]
+                self._hist = tuple(c[last] for c in self._hist)
+
+    def _count_pairs(self, p, i, m, u, sign=1):
+        pr = cross_instrument_pairs(p, _nan_codes(i), m, u, by_instrument=self.by_inst)
+        self.t3_pairs += sign * pr["n_pairs"]; self.t3_exceed += sign * pr["n_exceed"]
+        if self.by_inst:
+            labels = [-1 if c is None or math.isnan(c) else int(c) for c in pr["instruments"]]
+            for a, b in zip(*np.nonzero(pr["pairs"])):
+                # Orient by interned code (missing last) so run_all and chunks agree
+                key = tuple(sorted((labels[a], labels[b]), key=lambda c: (c < 0, c)))
+                slot = self.t3_matrix.setdefault(key, [0, 0])
+                slot[0] += sign * int(pr["pairs"][a, b]); slot[1] += sign * int(pr["exceed"][a, b])
+                if not slot[0]:
+                    del self.t3_matrix[key]
+
+    def _t3_result(self):
+        with stage("UN-T3"):
+            self._flush_parts(final=True)
+        if not self.has_instrument or not self.t3_pairs:
+            return {"n_pairs": 0, "exceed_rate": None}
+        res = {"n_pairs": self.t3_pairs, "exceed_rate": float(self.t3_exceed / self.t3_pairs)}
+        if self.by_inst:
+            label = lambda c: None if c < 0 else self.instruments.labels[c]
+            res["by_instrument_pair"] = [
+                {"instrument_a": label(a), "instrument_b": label(b), "n_pairs": n, "exceed_rate": float(e / n)}
+                for (a, b), (n, e) in sorted(self.t3_matrix.items(), key=lambda kv: [(c < 0, c) for c in kv[0]])
+            ]
+        return res
+
+    def result(self):
+        if self._dec is not None:
+            self._dec.close()
+            self._dec = None
+        share, counts = _tallies_from_counts(self.decision_counts)
+        bn, bf, bs, an, af, as_ = self.t4
+        report = {}
+        report["UN-T1"] = {"n": self.t1[0], "coverage_rate": self.t1[1] / self.t1[0] if self.t1[0] else None}
+        report["UN-T2"] = {"share": share, "counts": counts,
+                           "agreement_with_archival": self.agree[0] / self.agree[1] if self.agree and self.agree[1] else None}
+        report["UN-T3"] = self._t3_result()
+        report["UN-T4"] = {"before_n": bn, "after_n": an, "delta_mean": _delta_mean(bs, bf, as_, af) if bf and af else None}
+        if self.t4_plan is not None:
+            report["UN-T4"].update(drift_report(self.t4_parts, self.t4_plan))
+        report["UN-T5"] = {"n_edge": self.t5[0], "indeterminate_rate": self.t5[1] / self.t5[0] if self.t5[0] else None}
+        report["UN-T6"] = {"n": self.t6[0], "coverage": self.t6[1] / self.t6[0] if self.t6[0] else None}
+        if self.bootstrap:
+            with stage("bootstrap", self.n):
+                add_bootstrap_cis(report, self.row_types, (self.t3_pairs, self.t3_exceed), self.agree is not None, self.cfg)
+        return report
+
+    def save_state(self, path, **extra):
+        """
+        Write the mergeable state (counters, exact UN-T4 sums, UN-T3 rows of
+        parts that may still grow) to an .npz file. `extra` is stored in the
+        metadata, e.g. the input byte offset the state covers.
+        """
+        if not self.keep_history:
+            raise ValueError("save_state needs a validator created with keep_history=True")
+        self._flush_parts(final=True)
+        # Re-number the kept parts so completed parts cost nothing in the state
+        p, i, m, u = self._hist
+        kept, p = np.unique(p, return_inverse=True)
+        meta = {
+            "version": STATE_VERSION, "config": config_fingerprint(self.cfg), "n": self.n,
+            "decision_counts": self.decision_counts.tolist(), "t1": self.t1, "t6": self.t6, "t5": self.t5,
+            "row_types": self.row_types.tolist(),
+            "agree": self.agree, "t4": [_fraction_str(v) if isinstance(v, Fraction) else v for v in self.t4],
+            "t4_parts": [[list(k), n, nf, _fraction_str(v)] for k, (n, nf, v) in self.t4_parts.items()],
+            "t4_cuts": self.t4_plan and self.t4_plan["digest"],
+            "has_instrument": self.has_instrument, "t3": [self.t3_pairs, self.t3_exceed],
+            "t3_matrix": [[a, b, n, e] for (a, b), (n, e) in self.t3_matrix.items()],
+            "parts": [self.parts.labels[c] for c in kept], "instruments": self.instruments.labels, **extra,
+        }
+        with open(path, "wb") as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), part=p, instrument=i, measured=m, U=u)
+        return meta
+
+    @classmethod
+    def load_state(cls, path, cfg, decisions_path=None):
+        """Resume a validator saved by save_state; `cfg` must match the saved config."""
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            hist = (z["part"].astype(np.int64), z["instrument"].astype(np.int64),
+                    z["measured"].astype(float), z["U"].astype(float))
+        if meta.get("version") != STATE_VERSION:
+            raise ValueError(f"{path}: unsupported state version {meta.get('version')}")
+        if meta["config"] != config_fingerprint(cfg):
+            raise ValueError(f"{path}: state was computed with a different config")
+        plan = drift_plan(cfg)
+        if meta.get("t4_cuts") != (plan and plan["digest"]):
+            raise ValueError(f"{path}: calibration cuts changed since the state was saved")
+        sv = cls(cfg, decisions_path, keep_history=True)
+        sv.n = meta["n"]
+        sv.decision_counts = np.asarray(meta["decision_counts"], dtype=np.int64)
+        sv.t1, sv.t6, sv.t5, sv.agree = meta["t1"], meta["t6"], meta["t5"], meta["agree"]
+        sv.row_types = np.asarray(meta.get("row_types", sv.row_types), dtype=np.int64)
+        sv.t4 = [Fraction(v) if isinstance(v, str) else v for v in meta["t4"]]
+        sv.t4_parts = {tuple(k): [n, nf, Fraction(v)] for k, n, nf, v in meta.get("t4_parts", [])}
+        sv.has_instrument = meta["has_instrument"]
+        sv.t3_pairs, sv.t3_exceed = meta["t3"]
+        sv.t3_matrix = {(a, b): [n, e] for a, b, n, e in meta["t3_matrix"]}
+        sv.parts, sv.instruments = _Interner(meta["parts"], dtype=str), _Interner(meta["instruments"])
+        sv._hist = hist
+        sv.meta = meta
+        return sv
+
+def _empty_rows():
+    return (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), np.array([]))
+
+def run_all_chunked(chunks, cfg, decisions_path=None, since_state=None, save_state=None):
+    """
+    Streaming run_all over an iterable of DataFrame chunks (e.g. dataio.iter_dataset(path, N)).
+    With `since_state` the chunks are rows appended after that saved state and
+    the report covers old and new rows; `save_state` writes the updated state.
+    """
+    if since_state:
+        sv = StreamingValidator.load_state(since_state, cfg, decisions_path)
+    else:
+        sv = StreamingValidator(cfg, decisions_path, keep_history=bool(save_state))
+    for chunk in chunks:
+        sv.update(chunk)
+    report = sv.result()
+    if save_state:
+        sv.save_state(save_state)
+    return report
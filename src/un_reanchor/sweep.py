@@ -0,0 +1,111 @@
+"""
+Parameter sweeps: UN-T1, UN-T2, UN-T5 and UN-T6 over a grid of gamma,
+coverage_k and edge_delta values in one pass over the rows. Thresholds are
+broadcast along a parameter axis, (params, rows) blocks at a time, so every
+grid point costs a few vector comparisons instead of a full run; values are
+the ones run_all reports with those params.
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from .un_validation import CONFORM, NONCONFORM, INDETERMINATE, DECISION_LABELS, prepare_frame
+from .profiling import stage
+
+MAX_ELEMS = 1 << 22  # (parameter, row) cells per block
+
+SWEEP_COLUMNS = ["gamma", "coverage_k", "edge_delta", "test", "metric", "value"]
+
+def parse_grid(spec):
+    """Grid values from "0.5,1,2" or "lo:hi:n" (n evenly spaced values, both ends included)."""
+    spec = str(spec).strip()
+    if ":" in spec:
+        lo, hi, n = spec.split(":")
+        return [float(v) for v in np.linspace(float(lo), float(hi), int(n))]
+    return [float(v) for v in spec.split(",") if v.strip()]
+
+def _uncertainty_basis(df, cfg):
+    """(array, scales): the uncertainty_U column as is, or sigma to be multiplied by each coverage_k."""
+    col = cfg["columns"].get("uncertainty_U")
+    if col and col in df.columns:
+        return df[col].to_numpy(dtype=float), False
+    if "sigma" in df.columns:
+        return df["sigma"].to_numpy(dtype=float), True
+    raise ValueError("Provide either 'uncertainty_U' column or 'sigma' + coverage_k in config.")
+
+def sweep_counts(vf, basis, scales, gammas, ks, deltas, max_elems=None):
+    """
+    Per-grid-point counts over the rows of `vf`: UN-T1 / UN-T6 covered rows
+    per coverage_k, decision counts and archival agreement per (gamma, k),
+    edge rows per edge_delta and indeterminate edge rows per (gamma, k,
+    delta), the last as one matrix product of indeterminate and edge masks.
+    """
+    gammas, deltas = np.asarray(gammas, float), np.asarray(deltas, float)
+    ks = np.asarray(ks, float) if scales else np.ones(1)
+    G, K, D = len(gammas), len(ks), len(deltas)
+    out = {"n_true": 0, "t1": np.zeros(K, np.int64), "t6": np.zeros(K, np.int64),
+           "codes": np.zeros((G, K, 3), np.int64), "agree": np.zeros((G, K), np.int64),
+           "determ": np.zeros((G, K), np.int64), "n_edge": np.zeros(D, np.int64),
+           "edge_indet": np.zeros((G, K, D), np.int64)}
+    step = max(1, (max_elems or MAX_ELEMS) // max(G * K, D, 1))
+    for lo in range(0, vf.n, step):
+        s = slice(lo, min(lo + step, vf.n))
+        m, l, u, tol, t, has_true = vf.measured[s], vf.LSL[s], vf.USL[s], vf.tol[s], vf.true_value[s], vf.has_true[s]
+        # U = sigma * k in the same operation order as compute_uncertainty_U
+        U = basis[s][None, :] * ks[:, None] if scales else np.broadcast_to(basis[s], (1, len(m)))
+        mt, tt, Ut = m[has_true], t[has_true], U[:, has_true]
+        out["n_true"] += int(has_true.sum())
+        out["t1"] += (np.abs(mt - tt)[None, :] <= tol[has_true][None, :] + Ut).sum(axis=1)
+        out["t6"] += ((tt >= mt - Ut) & (tt <= mt + Ut)).sum(axis=1)
+        band = gammas[:, None, None] * U[None, :, :]
+        codes = np.full(band.shape, INDETERMINATE, dtype=np.int8)
+        codes[(m >= l + band) & (m <= u - band)] = CONFORM
+        codes[(m <= l - band) | (m >= u + band)] = NONCONFORM
+        del band
+        for c in (CONFORM, NONCONFORM, INDETERMINATE):
+            out["codes"][:, :, c] += (codes == c).sum(axis=2)
+        if vf.accepted is not None:
+            acc = np.asarray(vf.accepted[s])
+            out["agree"] += (((acc == 1) & (codes == CONFORM)) | ((acc == 0) & (codes == NONCONFORM))).sum(axis=2)
+            out["determ"] += (codes != INDETERMINATE).sum(axis=2)
+        edge = (np.abs(m - l)[None, :] <= deltas[:, None]) | (np.abs(u - m)[None, :] <= deltas[:, None])
+        out["n_edge"] += edge.sum(axis=1)
+        # float64 products of 0/1 masks are exact counts for any realistic block
+        indet = (codes == INDETERMINATE).reshape(G * K, -1).astype(np.float64)
+        out["edge_indet"] += np.rint(indet @ edge.T.astype(np.float64)).astype(np.int64).reshape(G, K, D)
+    return out
+
+def _rate(num, den):
+    return float(num / den) if den else np.nan
+
+def sweep(df, cfg, gamma=None, coverage_k=None, edge_delta=None):
+    """
+    Evaluate UN-T1, UN-T2, UN-T5 and UN-T6 at every combination of the
+    given gamma / coverage_k / edge_delta values (each defaults to the
+    config's value). Returns a tidy DataFrame with one row per grid point and
+    metric: gamma, coverage_k, edge_delta, test, metric, value (NaN where
+    run_all reports None, e.g. no rows with a true value).
+
+    coverage_k only matters when U comes from sigma; with an uncertainty_U
+    column every coverage_k gives the same values.
+    """
+    p = cfg["params"]
+    gammas = list(gamma) if gamma is not None else [float(p.get("gamma", 1.0))]
+    ks = list(coverage_k) if coverage_k is not None else [float(p.get("coverage_k", 2.0))]
+    deltas = list(edge_delta) if edge_delta is not None else [float(p.get("edge_delta", 0.1))]
+    basis, scales = _uncertainty_basis(df, cfg)
+    vf = prepare_frame(df, cfg)
+    with stage("sweep", vf.n):
+        c = sweep_counts(vf, basis, scales, gammas, ks, deltas)
+    rows = []
+    for (gi, g), (ki, k), (di, d) in itertools.product(enumerate(gammas), enumerate(ks), enumerate(deltas)):
+        kj = ki if scales else 0
+        codes = c["codes"][gi, kj]
+        metrics = [("UN-T1", "coverage_rate", _rate(c["t1"][kj], c["n_true"])),
+                   *(("UN-T2", f"share.{label}", _rate(codes[j], vf.n)) for j, label in enumerate(DECISION_LABELS)),
+                   ("UN-T2", "agreement_with_archival",
+                    _rate(c["agree"][gi, kj], c["determ"][gi, kj]) if vf.accepted is not None else np.nan),
+                   ("UN-T5", "n_edge", float(c["n_edge"][di])),
+                   ("UN-T5", "indeterminate_rate", _rate(c["edge_indet"][gi, kj, di], c["n_edge"][di])),
+                   ("UN-T6", "coverage", _rate(c["t6"][kj], c["n_true"]))]
+        rows.extend((g, k, d, test, name, value) for test, name, value in metrics)
+    return pd.DataFrame(rows, columns=SWEEP_COLUMNS)
@@ -1,47 +1,173 @@
-import pandas as pd
-from .uha import resolve_uha_address
+import csv, os
+import numpy as np
+from .profiling import stage
+from . import resampling
 
-def un_CT1_cosmology(df_h0: pd.DataFrame, uha_address: str):
+# CSV H0 tables up to this size are read and written with the csv module and
+# NumPy only (read_h0_csv / un_CT1_table / write_results_csv), skipping the
+# pandas import; results are identical to un_CT1_cosmology.
+SMALL_H0_BYTES = 4 << 20
+
+# Strings pandas.read_csv reads as missing by default
+_NA_VALUES = frozenset(["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                        "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"])
+
+def _resolve_anchors(anchors):
+    """Accept one address/anchor dict or a list of them; each address is resolved once."""
+    if isinstance(anchors, (str, dict)):
+        anchors = [anchors]
+    seen, out = {}, []
+    for a in anchors:
+        if isinstance(a, dict):
+            out.append(a)
+            continue
+        if a not in seen:
+            from .uha import resolve_uha_address
+            seen[a] = resolve_uha_address(a)
+        out.append(seen[a])
+    return out
+
+def _frames(df_h0):
+    if "frame" in df_h0.columns:
+        return df_h0["frame"].astype(str).to_numpy()
+    return np.full(len(df_h0), "", dtype=object)
+
+def _ct1_arrays(h0, u, frames, anchors, params=None):
+    a_val = np.array([float(a["value"]) for a in anchors])
+    a_u = np.array([float(a["u"]) for a in anchors])
+    cats, codes = np.unique(np.asarray(frames, dtype=object), return_inverse=True)
+    T_cat = np.empty((len(cats), len(anchors)))
+    for j, a in enumerate(anchors):
+        tmap = a.get("t_interframe", {}) or {}
+        default_T = float(tmap.get("default", 0.0))
+        T_cat[:, j] = [float(tmap.get(c, default_T)) for c in cats]
+    T = T_cat[codes] if len(cats) else np.zeros((len(h0), len(anchors)))
+    diff = np.abs(h0[:, None] - a_val[None, :])
+    rhs = u[:, None] + a_u[None, :] + T
+    m = {"anchors": anchors, "diff": diff, "rhs": rhs, "gap": diff - rhs, "holds": diff <= rhs,
+         "T_used": T, "anchor_value": a_val, "anchor_U": a_u}
+    st = resampling.settings(params)
+    if st["mc_draws"]:
+        with stage("monte_carlo", len(h0)):
+            m["p_holds"], m["mc_holds"] = resampling.ct1_monte_carlo(
+                h0, u, a_val, a_u, rhs, st["mc_draws"], st["coverage_k"], st["seed"], st["workers"])
+        m["mc"] = st
+    return m
+
+def un_CT1_matrix(df_h0, anchors, params=None):
     """
-    Expect df_h0 with columns: label, H0, uncertainty_U, frame
-    Anchor is loaded from UHA address (JSON schema provided).
-    Returns (summary_dict, per_row_results_df).
+    Evaluate every H0 row against every anchor in one broadcast.
+    `frame` is mapped to t_interframe through a categorical lookup (one dict
+    lookup per distinct frame and anchor). Returns a dict with "anchors" and
+    (n_rows, n_anchors) arrays diff, rhs, gap, holds and T_used; with
+    params.mc_draws > 0 also the Monte-Carlo p_holds and per-draw mc_holds
+    counts (see resampling.ct1_monte_carlo).
     """
-    anchor = resolve_uha_address(uha_address)
-    a_val = float(anchor["value"])
-    a_u = float(anchor["u"])
-    tmap = anchor.get("t_interframe", {}) or {}
-    default_T = float(tmap.get("default", 0.0))
-
-    rows = []
-    for _, r in df_h0.iterrows():
-        h0 = float(r["H0"])
-        u = float(r["uncertainty_U"])
-        frame = str(r.get("frame",""))
-        T = float(tmap.get(frame, default_T))
-        diff = abs(h0 - a_val)
-        rhs = u + a_u + T
-        hold = diff <= rhs
-        rows.append({
-            "label": r["label"],
-            "frame": frame,
-            "anchor_id": anchor.get("anchor_id","UHA"),
-            "diff": diff, "rhs": rhs, "gap": diff - rhs,
-            "holds": bool(hold), "T_used": T,
-            "H0": h0, "U": u, "anchor_value": a_val, "anchor_U": a_u
-        })
-    res = pd.DataFrame(rows)
-    summary = {
+    return _ct1_arrays(df_h0["H0"].to_numpy(dtype=float), df_h0["uncertainty_U"].to_numpy(dtype=float),
+                       _frames(df_h0), _resolve_anchors(anchors), params)
+
+def _long_columns(labels, frames, h0, u, m):
+    n, k = m["diff"].shape
+    return {
+        "label": np.tile(labels, k),
+        "frame": np.tile(frames, k),
+        "anchor_id": np.repeat(np.array([a.get("anchor_id", "UHA") for a in m["anchors"]], dtype=object), n),
+        "diff": m["diff"].T.ravel(), "rhs": m["rhs"].T.ravel(), "gap": m["gap"].T.ravel(),
+        "holds": m["holds"].T.ravel(), "T_used": m["T_used"].T.ravel(),
+        "H0": np.tile(h0, k), "U": np.tile(u, k),
+        "anchor_value": np.repeat(m["anchor_value"], n), "anchor_U": np.repeat(m["anchor_U"], n),
+        **({"p_holds": m["p_holds"].T.ravel()} if "p_holds" in m else {}),
+    }
+
+def _long_results(df_h0, m):
+    import pandas as pd
+    return pd.DataFrame(_long_columns(df_h0["label"].to_numpy(), _frames(df_h0), df_h0["H0"].to_numpy(dtype=float),
+                                      df_h0["uncertainty_U"].to_numpy(dtype=float), m))
+
+def _anchor_summary(anchor, holds):
+    return {
         "anchor": {
             "anchor_id": anchor.get("anchor_id"),
             "quantity": anchor.get("quantity"),
-            "value": a_val, "u": a_u, "units": anchor.get("units"),
+            "value": float(anchor["value"]), "u": float(anchor["u"]), "units": anchor.get("units"),
             "frame": anchor.get("frame")
         },
         "counts": {
-            "n": int(len(res)),
-            "holds": int(res["holds"].sum()),
-            "fails": int((~res["holds"]).sum())
+            "n": int(len(holds)),
+            "holds": int(holds.sum()),
+            "fails": int((~holds).sum())
         }
     }
-    return summary, res
+
+def _monte_carlo_summary(m, j):
+    st, n = m["mc"], len(m["holds"])
+    rate = m["mc_holds"][:, j] / n if n else np.full(len(m["mc_holds"]), np.nan)
+    return {"draws": st["mc_draws"], "coverage_k": st["coverage_k"], "seed": st["seed"], "ci_level": st["level"],
+            "holds_rate": float(rate.mean()) if n else None, "holds_rate_ci": resampling.percentile_ci(rate, st["level"])}
+
+def _summaries(m, multi):
+    per_anchor = [_anchor_summary(a, m["holds"][:, j]) for j, a in enumerate(m["anchors"])]
+    if "mc" in m:
+        for j, summary in enumerate(per_anchor):
+            summary["monte_carlo"] = _monte_carlo_summary(m, j)
+    return {"anchors": per_anchor} if multi else per_anchor[0]
+
+def un_CT1_cosmology(df_h0, uha_address, params=None):
+    """
+    Expect df_h0 with columns: label, H0, uncertainty_U, frame
+    Anchor is loaded from UHA address (JSON schema provided).
+    Returns (summary_dict, per_row_results_df).
+
+    `uha_address` may also be a list of addresses or anchor dicts: the whole
+    table is then evaluated against every anchor in one pass, the summary
+    holds one entry per anchor under "anchors", and the results are in long
+    format (rows of the first anchor, then the second, ...).
+
+    `params` (the config's params) may enable Monte-Carlo propagation of the
+    expanded uncertainties (mc_draws, coverage_k, seed, ci_level,
+    resample_workers): each anchor summary then gains a "monte_carlo" block
+    with the hold rate and its interval, and the results a p_holds column.
+    """
+    with stage("UN-CT1", len(df_h0)):
+        m = un_CT1_matrix(df_h0, uha_address, params)
+        return _summaries(m, isinstance(uha_address, (list, tuple))), _long_results(df_h0, m)
+
+def read_h0_csv(path):
+    """
+    Read an H0 table with the csv module into {"label", "H0", "uncertainty_U",
+    "frame"} NumPy arrays, with pandas' default missing-value handling.
+    """
+    with open(path, newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows, [])
+        cols = list(zip(*rows)) or [()] * len(header)
+    idx = {c: header.index(c) for c in ("label", "H0", "uncertainty_U", "frame") if c in header}
+    n = len(cols[0]) if cols else 0
+    def num(c):
+        return np.array([np.nan if v in _NA_VALUES else float(v) for v in cols[idx[c]]], dtype=float)
+    def text(c, missing):
+        if c not in idx:
+            return np.full(n, "", dtype=object)
+        return np.array([missing if v in _NA_VALUES else v for v in cols[idx[c]]], dtype=object)
+    # a missing label is written back as an empty field; a missing frame maps like the string "nan"
+    return {"label": text("label", ""), "H0": num("H0"), "uncertainty_U": num("uncertainty_U"),
+            "frame": text("frame", "nan")}
+
+def un_CT1_table(table, uha_address, params=None):
+    """un_CT1_cosmology on a read_h0_csv table; returns (summary, results as a dict of columns)."""
+    with stage("UN-CT1", len(table["H0"])):
+        m = _ct1_arrays(table["H0"], table["uncertainty_U"], table["frame"], _resolve_anchors(uha_address), params)
+        cols = _long_columns(table["label"], table["frame"], table["H0"], table["uncertainty_U"], m)
+        return _summaries(m, isinstance(uha_address, (list, tuple))), cols
+
+def _csv_text(v):
+    if isinstance(v, float):
+        return "" if v != v else repr(v)
+    return "" if v is None else str(v)
+
+def write_results_csv(cols, path):
+    """Write un_CT1_table results as DataFrame.to_csv(index=False) would."""
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f, lineterminator=os.linesep)
+        w.writerow(cols)
+        w.writerows(zip(*([_csv_text(v) for v in c.tolist()] for c in cols.values())))
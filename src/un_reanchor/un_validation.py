@@ -1,8 +1,13 @@
 import json, math
-from dataclasses import dataclass
-from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import Optional, Dict, Any, Tuple, Iterable
 import pandas as pd
 import numpy as np
+from .pairing import _float, cross_instrument_pairs, instrument_pair_table
+from .drift import NAT, timestamp_ns, cut_ns, exact_group_sums, drift_plan, drift_partials, drift_report
+from .profiling import stage
+from . import resampling
 
 @dataclass
 class Config:
@@ -24,7 +29,7 @@ def compute_spec_limits(df, cfg):
 
 def compute_uncertainty_U(df, cfg):
     if cfg["columns"].get("uncertainty_U") and cfg["columns"]["uncertainty_U"] in df.columns:
-        U = df[cfg["columns"]["uncertainty_U"]].astype(float)
+        U = df[cfg["columns"]["uncertainty_U"]].astype(float, copy=False)
     else:
         if "sigma" in df.columns:
             k = float(cfg["params"].get("coverage_k", 2.0))
@@ -33,17 +38,194 @@ def compute_uncertainty_U(df, cfg):
             raise ValueError("Provide either 'uncertainty_U' column or 'sigma' + coverage_k in config.")
     return U
 
-def un_T1_inequality_coverage(df, cfg):
-    measured = _col(df, "measured", cfg).astype(float)
-    truev = pd.to_numeric(_col(df, "true_value", cfg), errors='coerce')
+def _ro(values):
+    arr = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+    arr.flags.writeable = False
+    return arr
+
+@dataclass(frozen=True)
+class ValidationFrame:
+    """
+    Column arrays shared by UN-T1..UN-T6, converted once per dataset by
+    prepare_frame. Numeric arrays are contiguous, read-only float64; the
+    caller's DataFrame is never modified. Timestamps are converted to int64
+    nanoseconds (timestamp_ns) on first use.
+
+    compact_frame builds the low-memory variant: float32 arrays, compact
+    ids and `exact`, the rows whose row-wise comparisons are patched back to
+    their float64 outcome.
+    """
+    n: int
+    measured: np.ndarray
+    true_value: np.ndarray
+    LSL: np.ndarray
+    USL: np.ndarray
+    tol: np.ndarray
+    U: np.ndarray
+    has_true: np.ndarray
+    part_id: np.ndarray
+    instrument_id: Optional[Any] = None
+    timestamp: Optional[pd.Series] = None
+    accepted: Optional[np.ndarray] = None
+    part_family: Optional[Any] = None
+    exact: Optional[Dict[str, Any]] = None
+
+    @cached_property
+    def timestamp_ns(self):
+        return None if self.timestamp is None else timestamp_ns(self.timestamp)
+
+def prepare_frame(df, cfg) -> ValidationFrame:
+    if isinstance(df, ValidationFrame):
+        return df
+    with stage("spec_limits", len(df)):
+        return _prepare_frame(df, cfg)
+
+def _prepare_frame(df, cfg):
     LSL, USL, tol = compute_spec_limits(df, cfg)
-    U = compute_uncertainty_U(df, cfg)
-    mask = ~truev.isna()
+    truev = _ro(pd.to_numeric(_col(df, "true_value", cfg), errors='coerce'))
+    has_true = ~np.isnan(truev)
+    has_true.flags.writeable = False
+    cols = cfg["columns"]
+    def opt(name):
+        c = cols.get(name)
+        if not c or c not in df.columns:
+            return None
+        # categorical ids stay as codes + categories instead of an object array
+        return df[c].array if isinstance(df[c].dtype, pd.CategoricalDtype) else df[c].to_numpy()
+    return ValidationFrame(
+        n=len(df),
+        measured=_ro(_col(df, "measured", cfg).astype(float, copy=False)),
+        true_value=truev,
+        LSL=_ro(LSL), USL=_ro(USL), tol=_ro(tol),
+        U=_ro(compute_uncertainty_U(df, cfg)),
+        has_true=has_true,
+        part_id=_col(df, "part_id", cfg).to_numpy(),
+        instrument_id=opt("instrument_id"),
+        timestamp=df[cols["timestamp"]] if cols.get("timestamp") and cols["timestamp"] in df.columns else None,
+        accepted=opt("accepted"),
+        part_family=opt("part_family"),
+    )
+
+def _patch_exact(vf, name, values, param=None):
+    """Restore the float64 outcome of rows a compact_frame check found flipped by float32 storage."""
+    if vf.exact is not None and name in vf.exact and vf.exact[name][2] == param:
+        rows, exact, _ = vf.exact[name]
+        values[rows] = exact
+    return values
+
+_FLOAT_ARRAYS = ("measured", "true_value", "LSL", "USL", "tol", "U")
+
+def _f32(values):
+    arr = np.ascontiguousarray(values, dtype=np.float32)
+    arr.flags.writeable = False
+    return arr
+
+def _ids(chunk, cfg, name):
+    c = cfg["columns"].get(name)
+    if not c or c not in chunk.columns:
+        return None
+    col = chunk[c]
+    return col.array if isinstance(col.dtype, pd.CategoricalDtype) else pd.Categorical(col)
+
+def _part_keys(ids, n):
+    """
+    Per-row part keys of one chunk's categorical ids as fixed-width UTF-8
+    bytes (of their text, as in the CSV) plus the mask of missing ids; unlike
+    Python string objects these cost a few bytes per row. Without a part_id
+    column (ids None) all n rows are missing.
+    """
+    if ids is None:
+        return np.zeros(n, "S1"), np.ones(n, dtype=bool)
+    cats = np.char.encode(ids.categories.to_numpy().astype(str), "utf-8") if len(ids.categories) else np.zeros(1, "S1")
+    return cats[np.maximum(ids.codes, 0)], ids.codes < 0
+
+def _intern_parts(keys, missing):
+    """Categorical of dense part codes over all chunks' keys; only the identity of a part is used (UN-T3)."""
+    uniq, codes = np.unique(np.concatenate(keys or [np.zeros(0, "S1")]), return_inverse=True)
+    codes = codes.reshape(-1).astype(np.int32 if len(uniq) < 2**31 else np.int64)
+    codes[np.concatenate(missing or [np.zeros(0, bool)])] = -1
+    return pd.Categorical.from_codes(codes, pd.RangeIndex(len(uniq)))
+
+def _small_ints(values):
+    a = np.asarray(values)
+    if a.dtype.kind in "iub" or not np.isnan(a.astype(float)).any():
+        return a.astype(np.int8)
+    return a.astype(np.float32)
+
+def compact_frame(chunks: Iterable[pd.DataFrame], cfg) -> ValidationFrame:
+    """
+    Low-memory ValidationFrame built from DataFrame chunks (e.g.
+    DatasetInput.chunks): measurement arrays are stored as float32,
+    instrument / family ids as categoricals, part ids as dense integer codes
+    (their labels are never reported), accepted as int8 and timestamps as
+    datetime64[ns]; only one float64 chunk exists at a time.
+
+    Precision check: every chunk is evaluated twice, from its float64 values
+    and from the float32 arrays that are kept, for the row-wise comparisons
+    of UN-T1 (|m - t| <= tol + U), UN-T6 (m - U <= t <= m + U), UN-T2
+    (guard band at the configured gamma) and UN-T5 (edge_delta). Rows where
+    the outcomes differ are recorded in `exact` and patched back, so these
+    tests and the decisions equal the float64 run. UN-T3 pair comparisons and
+    UN-T4 means use the float32 values.
+    """
+    arrays = {f: [] for f in _FLOAT_ARRAYS + ("has_true", "timestamp", "accepted")}
+    ids = {f: [] for f in ("instrument_id", "part_family")}
+    parts, no_part = [], []
+    checks = (("UN-T1", _t1_covered, True, None), ("UN-T6", _t6_covered, True, None),
+              ("UN-T2", lambda v: _guard_band_decisions(v, cfg), False, float(cfg["params"].get("gamma", 1.0))),
+              ("UN-T5", lambda v: _edge_mask(v, cfg), False, float(cfg["params"].get("edge_delta", 0.1))))
+    flips = {name: [] for name, *_ in checks}
+    n = n_true = 0
+    for chunk in chunks:
+        full = _prepare_frame(chunk, cfg)
+        small = replace(full, **{f: _f32(getattr(full, f)) for f in _FLOAT_ARRAYS})
+        for name, check, masked, _ in checks:
+            want = check(full)
+            rows = np.flatnonzero(want != check(small))
+            flips[name].append((rows + (n_true if masked else n), want[rows]))
+        for f in _FLOAT_ARRAYS + ("has_true",):
+            arrays[f].append(getattr(small, f))
+        if full.timestamp is not None:
+            arrays["timestamp"].append(full.timestamp_ns.view("datetime64[ns]"))
+        if full.accepted is not None:
+            arrays["accepted"].append(_small_ints(full.accepted))
+        for f in ids:
+            ids[f].append(_ids(chunk, cfg, f))
+        keys, missing = _part_keys(_ids(chunk, cfg, "part_id"), len(chunk))
+        parts.append(keys)
+        no_part.append(missing)
+        del full, small
+        n += len(keys)
+        n_true += int(arrays["has_true"][-1].sum())
+    # one field at a time, dropping its chunks once joined
+    joined = {f: np.concatenate(arrays.pop(f)) if arrays[f] else None for f in list(arrays)}
+    for f in _FLOAT_ARRAYS + ("has_true",):
+        if joined[f] is None:
+            joined[f] = np.empty(0, dtype=bool if f == "has_true" else np.float32)
+        joined[f].flags.writeable = False
+    cats = {f: pd.api.types.union_categoricals(v, sort_categories=True) if v and v[0] is not None else None
+            for f, v in ids.items()}
+    exact = {name: (np.concatenate([r for r, _ in flips[name]]), np.concatenate([v for _, v in flips[name]]), param)
+             for name, _, _, param in checks if flips[name]}
+    return ValidationFrame(
+        n=n, **{f: joined[f] for f in _FLOAT_ARRAYS}, has_true=joined["has_true"],
+        part_id=_intern_parts(parts, no_part),
+        instrument_id=cats["instrument_id"], timestamp=joined["timestamp"], accepted=joined["accepted"],
+        part_family=cats["part_family"], exact=exact,
+    )
+
+def _t1_covered(vf):
+    mask = vf.has_true
+    lhs = np.abs(vf.measured[mask] - vf.true_value[mask])
+    rhs = vf.tol[mask] + vf.U[mask]
+    return _patch_exact(vf, "UN-T1", lhs <= rhs)
+
+def un_T1_inequality_coverage(df, cfg):
+    vf = prepare_frame(df, cfg)
+    mask = vf.has_true
     if mask.sum() == 0:
         return {"n": 0, "coverage_rate": None}
-    lhs = (measured - truev).abs()
-    rhs = tol + U
-    covered = lhs[mask] <= rhs[mask]
+    covered = _t1_covered(vf)
     return {"n": int(mask.sum()), "coverage_rate": float(covered.mean())}
 
 def iso_guard_band_decision(measured, LSL, USL, U, gamma=1.0):
@@ -53,94 +235,249 @@ def iso_guard_band_decision(measured, LSL, USL, U, gamma=1.0):
         return "conform"
     return "indeterminate"
 
-def un_T2_guard_band(df, cfg):
-    measured = _col(df, "measured", cfg).astype(float)
-    LSL, USL, tol = compute_spec_limits(df, cfg)
-    U = compute_uncertainty_U(df, cfg)
+# Decision codes used by the vectorized guard-band kernel (index into DECISION_LABELS)
+CONFORM, NONCONFORM, INDETERMINATE = 0, 1, 2
+DECISION_LABELS = ("conform", "nonconform", "indeterminate")
+_LABELS_ARR = np.array(DECISION_LABELS, dtype=object)
+
+def guard_band_codes(measured, LSL, USL, U, gamma=1.0):
+    """
+    Vectorized iso_guard_band_decision: returns an int8 array of decision codes
+    (CONFORM / NONCONFORM / INDETERMINATE). NaN inputs fall through to
+    INDETERMINATE, matching the scalar rule.
+    """
+    m, l, u, band = (_float(x) for x in (measured, LSL, USL, U))
+    band = gamma * band
+    codes = np.full(m.shape, INDETERMINATE, dtype=np.int8)
+    codes[(m >= l + band) & (m <= u - band)] = CONFORM
+    codes[(m <= l - band) | (m >= u + band)] = NONCONFORM
+    return codes
+
+def decisions_from_codes(codes):
+    return pd.Series(pd.Categorical.from_codes(codes, categories=list(DECISION_LABELS)), name="decision")
+
+def _write_decision_codes(f, codes, chunk=1 << 20):
+    for s in range(0, len(codes), chunk):
+        f.write("\n".join(_LABELS_ARR[codes[s:s+chunk]]))
+        f.write("\n")
+
+def write_decisions_csv(decisions, path, chunk=1 << 20):
+    """Write a decision Series/code array to CSV from its int8 codes, one chunk at a time."""
+    codes = decisions.cat.codes.to_numpy() if isinstance(decisions, pd.Series) else np.asarray(decisions)
+    with open(path, "w", newline="") as f:
+        f.write("decision\n")
+        _write_decision_codes(f, codes, chunk)
+    return path
+
+def _tallies_from_counts(counts):
+    n = int(sum(counts))
+    order = sorted((i for i in range(len(counts)) if counts[i]), key=lambda i: -counts[i])
+    return ({DECISION_LABELS[i]: float(counts[i] / n) for i in order},
+            {DECISION_LABELS[i]: int(counts[i]) for i in order})
+
+def _decision_tallies(codes):
+    return _tallies_from_counts(np.bincount(codes, minlength=len(DECISION_LABELS)))
+
+def _guard_band_decisions(vf, cfg):
     gamma = float(cfg["params"].get("gamma", 1.0))
-    decisions = [iso_guard_band_decision(m, l, u, uu, gamma) for m,l,u,uu in zip(measured, LSL, USL, U)]
-    out = pd.Series(decisions, name="decision")
-    res = out.value_counts(normalize=True).to_dict()
-    res_counts = out.value_counts().to_dict()
-    acc_col = cfg["columns"].get("accepted")
+    return _patch_exact(vf, "UN-T2", guard_band_codes(vf.measured, vf.LSL, vf.USL, vf.U, gamma), gamma)
+
+def _archival_agreement(accepted, codes):
+    """Per determinate row: does the archival accepted flag (1/0) match conform/nonconform?"""
+    determ_mask = codes != INDETERMINATE
+    acc = accepted[determ_mask]
+    c = codes[determ_mask]
+    return ((acc == 1) & (c == CONFORM)) | ((acc == 0) & (c == NONCONFORM))
+
+def un_T2_guard_band(df, cfg, codes=None):
+    vf = prepare_frame(df, cfg)
+    if codes is None:
+        codes = _guard_band_decisions(vf, cfg)
+    res, res_counts = _decision_tallies(codes)
     agree = None
-    if acc_col and acc_col in df.columns:
-        determ_mask = out.isin(["conform","nonconform"])
-        if determ_mask.sum() > 0:
-            mapping = {1:"conform", 0:"nonconform"}
-            gold = df.loc[determ_mask, acc_col].map(mapping)
-            agree = (out[determ_mask] == gold).mean()
-    return {"share": res, "counts": res_counts, "agreement_with_archival": None if agree is None else float(agree)}, out
+    if vf.accepted is not None:
+        hits = _archival_agreement(vf.accepted, codes)
+        if len(hits) > 0:
+            agree = hits.mean()
+    return {"share": res, "counts": res_counts, "agreement_with_archival": None if agree is None else float(agree)}, decisions_from_codes(codes)
 
 def un_T3_cross_instrument(df, cfg):
-    inst_col = cfg["columns"].get("instrument_id")
-    if not inst_col or inst_col not in df.columns:
-        return {"n_pairs": 0, "exceed_rate": None}
-    U = compute_uncertainty_U(df, cfg)
-    measured = _col(df, "measured", cfg).astype(float)
-    pid = _col(df, "part_id", cfg)
-    pairs = []
-    for part, g in df.groupby(pid):
-        if g[inst_col].nunique() < 2: continue
-        g = g.reset_index(drop=True)
-        for i in range(len(g)):
-            for j in range(i+1, len(g)):
-                diff = abs(g.loc[i, cfg["columns"]["measured"]] - g.loc[j, cfg["columns"]["measured"]])
-                u_sum = g.loc[i, "uncertainty_U"] + g.loc[j, "uncertainty_U"]
-                pairs.append(diff > u_sum)
-    if not pairs:
-        return {"n_pairs": 0, "exceed_rate": None}
-    exceed_rate = float(np.mean(pairs))
-    return {"n_pairs": len(pairs), "exceed_rate": exceed_rate}
+    return _un_T3(prepare_frame(df, cfg), cfg)[0]
+
+def _un_T3(vf, cfg):
+    """(UN-T3 result, (n_pairs, n_exceed)); the integer counts feed the bootstrap."""
+    if vf.instrument_id is None:
+        return {"n_pairs": 0, "exceed_rate": None}, (0, 0)
+    by_inst = bool(cfg["params"].get("by_instrument_pair", False))
+    pr = cross_instrument_pairs(vf.part_id, vf.instrument_id, vf.measured, vf.U, by_instrument=by_inst)
+    if not pr["n_pairs"]:
+        return {"n_pairs": 0, "exceed_rate": None}, (0, 0)
+    res = {"n_pairs": pr["n_pairs"], "exceed_rate": float(pr["n_exceed"] / pr["n_pairs"])}
+    if by_inst:
+        res["by_instrument_pair"] = instrument_pair_table(pr)
+    return res, (pr["n_pairs"], pr["n_exceed"])
+
+def _exact_sum(x):
+    """Exact sum of the finite values of a float array as a Fraction; see exact_group_sums."""
+    x = np.asarray(x, dtype=np.float64)
+    return exact_group_sums(x, np.zeros(len(x), dtype=np.int64), 1)[0]
+
+def _delta_mean(before_sum, before_n, after_sum, after_n):
+    return float(after_sum / after_n - before_sum / before_n)
+
+def _calibration_split(vf, cut):
+    ts, cut = vf.timestamp_ns, cut_ns(cut)
+    return (ts != NAT) & (ts < cut), ts >= cut
 
 def un_T4_temporal_drift(df, cfg):
+    """
+    Mean shift across the global calibration_cut (before_n, after_n,
+    delta_mean) and, when configured (see drift.drift_plan), per-instrument
+    and per-part-family cuts ("cuts") and rolling drift ("drift_series").
+    """
     cut = cfg["params"].get("calibration_cut")
-    if not cut:
-        return {"before_n": 0, "after_n": 0, "delta_mean": None}
-    measured = _col(df, "measured", cfg).astype(float)
-    ts_col = cfg["columns"].get("timestamp")
-    if not ts_col or ts_col not in df.columns:
-        return {"before_n": 0, "after_n": 0, "delta_mean": None}
-    ts = pd.to_datetime(df[ts_col])
-    before = measured[ts < pd.to_datetime(cut)]
-    after = measured[ts >= pd.to_datetime(cut)]
-    if len(before)==0 or len(after)==0:
-        return {"before_n": int(len(before)), "after_n": int(len(after)), "delta_mean": None}
-    return {"before_n": int(len(before)), "after_n": int(len(after)), "delta_mean": float(after.mean()-before.mean())}
-
-def un_T5_edge_of_spec(df, cfg):
-    measured = _col(df, "measured", cfg).astype(float)
-    LSL, USL, tol = compute_spec_limits(df, cfg)
+    plan = drift_plan(cfg)
+    res = {"before_n": 0, "after_n": 0, "delta_mean": None}
+    if not cut and plan is None:
+        return res
+    vf = prepare_frame(df, cfg)
+    if vf.timestamp is not None and cut:
+        is_before, is_after = _calibration_split(vf, cut)
+        before = vf.measured[is_before]
+        after = vf.measured[is_after]
+        res = {"before_n": int(len(before)), "after_n": int(len(after)), "delta_mean": None}
+        # like pandas' mean (skipna), non-finite measurements are left out of the means
+        before, after = before[np.isfinite(before)], after[np.isfinite(after)]
+        if len(before) and len(after):
+            res["delta_mean"] = _delta_mean(_exact_sum(before), len(before), _exact_sum(after), len(after))
+    if plan is not None:
+        parts = {} if vf.timestamp is None else drift_partials(vf.timestamp_ns, vf.instrument_id, vf.part_family, vf.measured, plan)
+        res.update(drift_report(parts, plan))
+    return res
+
+def _edge_mask(vf, cfg):
     delta = float(cfg["params"].get("edge_delta", 0.1))
-    near = (abs(measured - LSL) <= delta) | (abs(USL - measured) <= delta)
+    return _patch_exact(vf, "UN-T5", (np.abs(vf.measured - vf.LSL) <= delta) | (np.abs(vf.USL - vf.measured) <= delta), delta)
+
+def un_T5_edge_of_spec(df, cfg, codes=None):
+    vf = prepare_frame(df, cfg)
+    near = _edge_mask(vf, cfg)
     if near.sum()==0:
         return {"n_edge": 0, "indeterminate_rate": None}
-    U = compute_uncertainty_U(df, cfg)
-    gamma = float(cfg["params"].get("gamma", 1.0))
-    decisions = [iso_guard_band_decision(m, l, u, uu, gamma) for m,l,u,uu in zip(measured[near], LSL[near], USL[near], U[near])]
-    indec_rate = np.mean(pd.Series(decisions)=="indeterminate")
+    if codes is None:
+        codes = _guard_band_decisions(vf, cfg)
+    indec_rate = np.mean(codes[near] == INDETERMINATE)
     return {"n_edge": int(near.sum()), "indeterminate_rate": float(indec_rate)}
 
+def _t6_covered(vf):
+    mask = vf.has_true
+    truev, measured, U = vf.true_value[mask], vf.measured[mask], vf.U[mask]
+    return _patch_exact(vf, "UN-T6", (truev >= measured-U) & (truev <= measured+U))
+
 def un_T6_interval_coverage(df, cfg):
-    measured = _col(df, "measured", cfg).astype(float)
-    truev = pd.to_numeric(_col(df, "true_value", cfg), errors='coerce')
-    U = compute_uncertainty_U(df, cfg)
-    mask = ~truev.isna()
+    vf = prepare_frame(df, cfg)
+    mask = vf.has_true
     if mask.sum()==0:
         return {"n": 0, "coverage": None}
-    covered = (truev[mask] >= measured[mask]-U[mask]) & (truev[mask] <= measured[mask]+U[mask])
+    covered = _t6_covered(vf)
     return {"n": int(mask.sum()), "coverage": float(covered.mean())}
 
-def run_all(df, cfg):
-    if "uncertainty_U" not in df.columns:
-        if "sigma" in df.columns:
-            df["uncertainty_U"] = df["sigma"] * float(cfg["params"].get("coverage_k", 2.0))
-    report = {}
-    report["UN-T1"] = un_T1_inequality_coverage(df, cfg)
-    gb_res, decisions = un_T2_guard_band(df, cfg)
-    report["UN-T2"] = gb_res
-    report["UN-T3"] = un_T3_cross_instrument(df, cfg)
-    report["UN-T4"] = un_T4_temporal_drift(df, cfg)
-    report["UN-T5"] = un_T5_edge_of_spec(df, cfg)
-    report["UN-T6"] = un_T6_interval_coverage(df, cfg)
+# Row types for the bootstrap: bit 0 has a true value, 1 UN-T1 covered,
+# 2 UN-T6 covered, 3 near a spec edge, 4 agrees with the archival flag,
+# bits 5-6 the decision code
+N_ROW_TYPES = 3 << 5
+
+def _row_type_counts(vf, cfg, codes):
+    """Number of rows of each bootstrap row type (see N_ROW_TYPES)."""
+    t = vf.has_true.astype(np.int64)
+    for bit, covered in ((1, _t1_covered(vf)), (2, _t6_covered(vf))):
+        t[vf.has_true] |= covered.astype(np.int64) << bit
+    t |= _edge_mask(vf, cfg).astype(np.int64) << 3
+    if vf.accepted is not None:
+        t[codes != INDETERMINATE] |= _archival_agreement(vf.accepted, codes).astype(np.int64) << 4
+    t |= codes.astype(np.int64) << 5
+    return np.bincount(t, minlength=N_ROW_TYPES)
+
+def _rate_masks(has_accepted):
+    t = np.arange(N_ROW_TYPES)
+    has_true, edge, code = (t & 1) > 0, (t & 8) > 0, t >> 5
+    rates = {("UN-T1", "coverage_rate"): ((t & 2) > 0, has_true),
+             ("UN-T6", "coverage"): ((t & 4) > 0, has_true),
+             ("UN-T5", "indeterminate_rate"): (edge & (code == INDETERMINATE), edge)}
+    if has_accepted:
+        rates[("UN-T2", "agreement_with_archival")] = ((t & 16) > 0, code != INDETERMINATE)
+    for c, label in enumerate(DECISION_LABELS):
+        rates[("UN-T2", "share", label)] = (code == c, np.ones(N_ROW_TYPES, dtype=bool))
+    return rates
+
+def add_bootstrap_cis(report, row_types, t3_counts, has_accepted, cfg):
+    """
+    Add bootstrap percentile intervals ("<rate>_ci", "share_ci") to the rate
+    metrics of `report` when params.bootstrap_n > 0. Rows are resampled
+    jointly for UN-T1/T2/T5/T6 from their row-type counts; UN-T3 resamples
+    its (n_pairs, n_exceed) pairs on their own. Pairs of one part share
+    rows, so the UN-T3 interval assumes independent pairs and is narrower
+    than a by-part bootstrap when parts have many measurements. Intervals
+    are None where the rate itself is.
+    """
+    st = resampling.settings(cfg["params"])
+    if not st["bootstrap_n"]:
+        return report
+    B, level = st["bootstrap_n"], st["level"]
+    cis = resampling.bootstrap_rates(row_types, _rate_masks(has_accepted), B, level,
+                                     np.random.default_rng([st["seed"], 0]))
+    n_pairs, n_exceed = t3_counts
+    if n_pairs:
+        cis.update(resampling.bootstrap_rates([n_pairs - n_exceed, n_exceed], {("UN-T3", "exceed_rate"): ([False, True], [True, True])},
+                                              B, level, np.random.default_rng([st["seed"], 1])))
+    for key, ci in cis.items():
+        if key[1] == "share":
+            if key[2] in report["UN-T2"]["share"]:
+                report["UN-T2"].setdefault("share_ci", {})[key[2]] = ci
+        elif report[key[0]].get(key[1]) is not None:
+            report[key[0]][key[1] + "_ci"] = ci
+    report["bootstrap"] = {"n": B, "ci_level": level, "seed": st["seed"]}
+    return report
+
+TESTS = ("UN-T1", "UN-T2", "UN-T3", "UN-T4", "UN-T5", "UN-T6")
+
+def run_all(df, cfg, tests=None):
+    """
+    UN-T1..UN-T6 on a DataFrame (or ValidationFrame); returns (report,
+    decisions). `tests` restricts the run to some of TESTS, e.g. to recompute
+    only the tests a cached report lacks; decisions are then None unless
+    UN-T2 is run. Bootstrap intervals (params.bootstrap_n) need every test.
+    """
+    want = set(TESTS if tests is None else tests)
+    boot = resampling.settings(cfg["params"])["bootstrap_n"]
+    if boot and want != set(TESTS):
+        raise ValueError("bootstrap intervals need every test; run_all(tests=None)")
+    vf = prepare_frame(df, cfg)
+    n = vf.n
+    report, codes, decisions, t3_counts = {}, None, None, (0, 0)
+    if "UN-T1" in want:
+        with stage("UN-T1", n):
+            report["UN-T1"] = un_T1_inequality_coverage(vf, cfg)
+    if want & {"UN-T2", "UN-T5"}:
+        with stage("UN-T2", n):
+            codes = _guard_band_decisions(vf, cfg)
+            if "UN-T2" in want:
+                report["UN-T2"], decisions = un_T2_guard_band(vf, cfg, codes)
+    if "UN-T3" in want:
+        with stage("UN-T3", n):
+            report["UN-T3"], t3_counts = _un_T3(vf, cfg)
+    if "UN-T4" in want:
+        with stage("UN-T4", n):
+            report["UN-T4"] = un_T4_temporal_drift(vf, cfg)
+    if "UN-T5" in want:
+        with stage("UN-T5", n):
+            report["UN-T5"] = un_T5_edge_of_spec(vf, cfg, codes)
+    if "UN-T6" in want:
+        with stage("UN-T6", n):
+            report["UN-T6"] = un_T6_interval_coverage(vf, cfg)
+    if vf.exact is not None:
+        report["low_memory"] = {"dtype": "float32", "exact_rows": {k: int(len(v[0])) for k, v in vf.exact.items()}}
+    if boot:
+        with stage("bootstrap", n):
+            add_bootstrap_cis(report, _row_type_counts(vf, cfg, codes), t3_counts, vf.accepted is not None, cfg)
     return report, decisions
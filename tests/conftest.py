@@ -0,0 +1,40 @@
+import numpy as np, pandas as pd, pytest
+
+@pytest.fixture(autouse=True)
+def _result_cache(tmp_path_factory, monkeypatch):
+    # keep CLI runs from reading or filling the user's result cache
+    monkeypatch.setenv("UNREANCHOR_RESULT_CACHE", str(tmp_path_factory.mktemp("result_cache")))
+
+def _metrology_frame(n=600, seed=3, parts=90, instruments=("A", "B", "C"), sorted_parts=True, true_share=0.3,
+                     accepted=True, timestamps="hourly", families=None, nan_every=0):
+    """
+    Random metrology rows: part ids (sorted, i.e. contiguous parts, unless
+    sorted_parts=False), measured ~ N(10, 0.03) with every nan_every-th value
+    missing, true values on a true_share of rows, an accepted column,
+    timestamps "hourly" (as text), "random" (over 60 days) or None, and a
+    "family" column drawn from `families`.
+    """
+    rng = np.random.default_rng(seed)
+    part = rng.integers(0, parts, n)
+    measured = rng.normal(10, 0.03, n)
+    if nan_every:
+        measured[np.arange(n) % nan_every == 5] = np.nan
+    df = pd.DataFrame({"part_id": np.sort(part) if sorted_parts else part,
+                       "nominal": 10.0, "tol_lower": 0.05, "tol_upper": 0.05, "measured": measured,
+                       "uncertainty_U": rng.uniform(0, 0.02, n), "instrument_id": rng.choice(list(instruments), n)})
+    if true_share:
+        df["true_value"] = np.where(rng.random(n) < true_share, rng.normal(10, 0.01, n), np.nan)
+    if accepted:
+        df["accepted"] = rng.integers(0, 2, n)
+    if families:
+        df["family"] = rng.choice(list(families), n)
+    if timestamps == "hourly":
+        df["timestamp"] = pd.date_range("2024-01-01", periods=n, freq="h").astype(str)
+    elif timestamps == "random":
+        df["timestamp"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60 * 24 * 3600, n), unit="s")
+    return df
+
+@pytest.fixture
+def make_dataset():
+    """Factory of random metrology DataFrames: make_dataset(n, seed, ...) (see _metrology_frame)."""
+    return _metrology_frame
@@ -0,0 +1,66 @@
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import yaml
+from un_reanchor.batch import BatchJob, run_batch
+from un_reanchor.un_validation import run_all
+
+def test_sharded_batch_matches_run_all(tmp_path, make_dataset):
+    df = make_dataset(900)
+    df.to_csv(tmp_path / "line.csv", index=False)
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    expected, _ = run_all(df, cfg)
+    jobs = [BatchJob(str(tmp_path / "line.csv"), "configs/config.sample.yaml", str(tmp_path / "out" / "a")),
+            BatchJob(str(tmp_path / "line.csv"), "configs/config.sample.yaml", str(tmp_path / "out" / "b"), shards=3)]
+    summary = run_batch(jobs, str(tmp_path / "out"), workers=2, chunksize=250)
+    assert summary["totals"] == {"datasets": 2, "ok": 2, "failed": 0}
+    for name in ("a", "b"):
+        report = json.load(open(tmp_path / "out" / name / "report.json"))
+        assert json.dumps(report, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+def test_shards_agree_when_chunks_parse_part_ids_differently(tmp_path, make_dataset):
+    # the last chunk holds non-numeric ids, so pandas would infer int ids in
+    # the first chunks and str ids there; a part must still land in one shard
+    df = make_dataset(900).sample(frac=1, random_state=1, ignore_index=True)
+    df["part_id"] = df["part_id"].astype(str).where(df.index < 880, "P1")
+    df.to_csv(tmp_path / "line.csv", index=False)
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    expected, _ = run_all(pd.read_csv(tmp_path / "line.csv", dtype={"part_id": str}), cfg)
+    jobs = [BatchJob(str(tmp_path / "line.csv"), "configs/config.sample.yaml", str(tmp_path / "out" / "s"), shards=4)]
+    assert run_batch(jobs, str(tmp_path / "out"), workers=2, chunksize=250)["totals"]["ok"] == 1
+    report = json.load(open(tmp_path / "out" / "s" / "report.json"))
+    assert report["UN-T3"] == json.loads(json.dumps(expected["UN-T3"]))
+
+def test_sharded_h0_job_runs_un_ct1_only(tmp_path):
+    jobs = [BatchJob("data/h0_pairs.csv", "configs/config.sample.yaml", str(tmp_path / "out" / "h0"),
+                     "file:configs/uha_anchor.example.json", shards=2)]
+    summary = run_batch(jobs, str(tmp_path / "out"), workers=2)
+    assert summary["totals"]["ok"] == 1 and summary["jobs"][0]["report"] is None
+    assert summary["jobs"][0]["un_ct1"]["counts"]["n"] > 0
+    written = sorted(p.name for p in (tmp_path / "out" / "h0").iterdir())
+    assert written == ["un_ct1_results.csv", "un_ct1_summary.json"]
+
+def test_remote_anchor_shared_by_jobs_is_resolved_once(tmp_path, monkeypatch):
+    from un_reanchor import net
+    body = open("configs/uha_anchor.example.json", "rb").read()
+    hits = []
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *a):
+            pass
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(net, "_CACHE_DIR", str(tmp_path / "cache"))
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/uha_anchor.json"
+    jobs = [BatchJob("data/h0_pairs.csv", "configs/config.sample.yaml", str(tmp_path / "out" / f"h{i}"), url)
+            for i in range(3)]
+    try:
+        summary = run_batch(jobs, str(tmp_path / "out"), workers=2)
+    finally:
+        httpd.shutdown()
+    assert summary["totals"]["ok"] == 3 and hits == ["/uha_anchor.json"]
@@ -0,0 +1,23 @@
+import json, os, sys
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from make_synthetic import metrology_chunks, synthetic_metrology, synthetic_h0
+import bench
+
+def test_synthetic_is_chunk_independent():
+    a = synthetic_metrology(200_000, chunk=65536, repeat=4, instruments=5)
+    b = pd.concat(list(metrology_chunks(200_000, chunk=1 << 20, repeat=4, instruments=5)), ignore_index=True)
+    pd.testing.assert_frame_equal(a, b)
+    assert a["part_id"].is_monotonic_increasing and a["part_id"].nunique() == 50_000
+    assert set(a["instrument_id"]) == set("ABCDE")
+    assert list(synthetic_h0(10).columns) == ["label", "H0", "uncertainty_U", "frame"]
+
+def test_bench_run_and_regression_check(tmp_path):
+    out = tmp_path / "r.json"
+    assert bench.main(["--sizes", "1e3", "--repeat", "1", "--only", "run_all|un_CT1", "--out", str(out)]) == 0
+    results = json.load(open(out))["results"]
+    assert set(results) == {"run_all@1000", "un_CT1@1000"}
+    slow = {k: {**r, "seconds": r["seconds"] * 2 + 1, "peak_mb": r["peak_mb"] * 3 + 2} for k, r in results.items()}
+    assert {r["metric"] for r in bench.compare(slow, results)} == {"seconds", "peak_mb"}
+    assert bench.compare(results, results) == []
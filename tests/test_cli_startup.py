@@ -0,0 +1,24 @@
+import ast, subprocess, sys
+
+_PROBE = """
+import sys
+from un_reanchor.cli import main
+sys.argv = ["unreanchor"] + sys.argv[1:]
+try:
+    main()
+except SystemExit:
+    pass
+print("HEAVY", sorted(m for m in ("pandas", "yaml", "http.client", "urllib.request") if m in sys.modules), file=sys.stderr)
+"""
+
+def _probe(*args):
+    out = subprocess.run([sys.executable, "-c", _PROBE, *args], capture_output=True, text=True, check=True).stderr
+    line = next(l for l in out.splitlines() if l.startswith("HEAVY"))
+    return ast.literal_eval(line[len("HEAVY "):])
+
+def test_help_and_small_h0_run_skip_heavy_imports(tmp_path):
+    assert _probe("--help") == []
+    heavy = _probe("run", "--data", "data/h0_pairs.csv", "--config", "configs/config.sample.yaml",
+                   "--out", str(tmp_path), "--uha", "configs/uha_anchor.example.json")
+    assert "pandas" not in heavy and "http.client" not in heavy
+    assert (tmp_path / "un_ct1_results.csv").exists()
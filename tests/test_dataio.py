@@ -0,0 +1,37 @@
+import json
+import pandas as pd, pytest, yaml
+from un_reanchor.dataio import read_dataset, iter_dataset, projected_columns, write_decisions, inspect_input
+from un_reanchor.un_validation import run_all
+
+def test_csv_projection_and_chunks(tmp_path):
+    df = pd.read_csv("data/demo.csv").assign(unused="x")
+    df.to_csv(tmp_path / "d.csv", index=False)
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    got = read_dataset(str(tmp_path / "d.csv"), projected_columns(cfg))
+    assert "unused" not in got.columns
+    assert sum(len(c) for c in iter_dataset(str(tmp_path / "d.csv"), 50, projected_columns(cfg))) == len(df)
+
+def test_parquet_and_arrow_roundtrip(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.feather
+    df = pd.read_csv("data/demo.csv")
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    expected, decisions = run_all(df, cfg)
+    df.to_parquet(tmp_path / "d.parquet")
+    pyarrow.feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path / "d.arrow")
+    for name in ("d.parquet", "d.arrow"):
+        report, _ = run_all(read_dataset(str(tmp_path / name), projected_columns(cfg)), cfg)
+        assert json.dumps(report, sort_keys=True) == json.dumps(expected, sort_keys=True)
+    write_decisions(decisions, tmp_path / "decisions.parquet")
+    back = pd.read_parquet(tmp_path / "decisions.parquet")["decision"]
+    assert (back.astype(str) == decisions.astype(str)).all()
+
+def test_inspect_input_kind_and_dtypes(tmp_path):
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    inp = inspect_input("data/demo.csv", cfg)
+    assert inp.kind == "metrology"
+    df = inp.read()
+    assert df[cfg["columns"]["measured"]].dtype == "float64"
+    assert isinstance(df[cfg["columns"]["instrument_id"]].dtype, pd.CategoricalDtype)
+    pd.DataFrame({"label": ["a"], "H0": [70.0], "uncertainty_U": [1.0], "frame": ["x"]}).to_csv(tmp_path / "h0.csv", index=False)
+    assert inspect_input(str(tmp_path / "h0.csv")).kind == "h0"
@@ -0,0 +1,66 @@
+import json
+import numpy as np, pandas as pd, yaml
+from un_reanchor.un_validation import run_all, un_T4_temporal_drift
+from un_reanchor.streaming import run_all_chunked
+
+# random timestamps over 60 days, part families and a few missing measurements
+# (left out of every mean, as by pandas)
+_DATASET = dict(seed=5, parts=100, sorted_parts=False, true_share=0, accepted=False, timestamps="random",
+                families=("shaft", "gear"), nan_every=37)
+
+def _cfg(tmp_path):
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    (tmp_path / "events.csv").write_text("instrument_id,timestamp\nB,2024-02-01\n,2024-02-15\n")
+    cfg["columns"]["part_family"] = "family"
+    cfg["params"].update(calibration_cut="2024-01-20", calibration_cuts={"A": ["2024-01-10", "2024-02-20"]},
+                         calibration_events=str(tmp_path / "events.csv"), drift_window="14D", drift_step="7D")
+    return cfg
+
+def _mean_delta(df, lo, cut, hi):
+    ts = df["timestamp"]
+    before, after = df["measured"][(ts >= lo) & (ts < cut)], df["measured"][(ts >= cut) & (ts < hi)]
+    return len(before), len(after), after.mean() - before.mean()
+
+def test_per_instrument_cuts_match_groupby(tmp_path, make_dataset):
+    df = make_dataset(800, **_DATASET)
+    res = un_T4_temporal_drift(df, _cfg(tmp_path))
+    shared = ["2024-01-20", "2024-02-15"]
+    expected_cuts = {"A": sorted(["2024-01-10", "2024-02-20"] + shared), "B": sorted(["2024-02-01"] + shared), "C": shared}
+    got = [(c["instrument_id"], c["cut"][:10]) for c in res["cuts"]]
+    assert got == [(i, c) for i in "ABC" for c in expected_cuts[i]]
+    for entry in res["cuts"]:
+        cuts = ["1900-01-01"] + expected_cuts[entry["instrument_id"]] + ["2100-01-01"]
+        j = cuts.index(entry["cut"][:10])
+        sub = df[df["instrument_id"] == entry["instrument_id"]]
+        bn, an, delta = _mean_delta(sub, cuts[j - 1], cuts[j], cuts[j + 1])
+        assert (entry["before_n"], entry["after_n"]) == (bn, an)
+        assert np.isclose(entry["delta_mean"], delta)
+        for fam in entry["by_family"]:
+            fb, fa, fd = _mean_delta(sub[sub["family"] == fam["part_family"]], cuts[j - 1], cuts[j], cuts[j + 1])
+            assert (fam["before_n"], fam["after_n"]) == (fb, fa) and np.isclose(fam["delta_mean"], fd)
+    sub = df[df["instrument_id"] == "C"].set_index("timestamp").sort_index()["measured"]
+    series = [s for s in res["drift_series"] if s["instrument_id"] == "C"]
+    for s in series:
+        w = sub[s["window_start"]:pd.Timestamp(s["window_end"]) - pd.Timedelta(1)]
+        assert s["n"] == len(w) and np.isclose(s["mean"], w.mean())
+    assert series[0]["drift"] == 0.0
+
+def test_chunked_and_resumed_drift_match_in_memory(tmp_path, make_dataset):
+    df = make_dataset(900, **_DATASET).sort_values("timestamp", ignore_index=True)
+    df["timestamp"] = df["timestamp"].astype(str)
+    cfg = _cfg(tmp_path)
+    state = None
+    for i, (a, b) in enumerate([(0, 400), (400, 900)]):
+        chunks = (df.iloc[s:min(s + 55, b)] for s in range(a, b, 55))
+        report = run_all_chunked(chunks, cfg, since_state=state, save_state=tmp_path / f"s{i}.npz")
+        state = tmp_path / f"s{i}.npz"
+        expected, _ = run_all(df.iloc[:b], cfg)
+        assert json.dumps(report, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+def test_non_finite_measurements_are_skipped(tmp_path, make_dataset):
+    df = make_dataset(300, **_DATASET)
+    df.loc[df.index[::11], "measured"] = np.inf
+    t4 = un_T4_temporal_drift(df, _cfg(tmp_path))
+    text = json.dumps(t4, allow_nan=False)  # raises on NaN / inf
+    finite = df.assign(measured=df["measured"].where(np.isfinite(df["measured"])))
+    assert text == json.dumps(un_T4_temporal_drift(finite, _cfg(tmp_path)), allow_nan=False)
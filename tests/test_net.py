@@ -0,0 +1,72 @@
+import json, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from un_reanchor import net
+from un_reanchor.uha import resolve_uha_address
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = json.dumps({"anchor_id": "T", "value": 68.0, "u": 0.5}).encode()
+    hits = []
+    ports = set()
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get("If-None-Match")))
+        self.ports.add(self.client_address[1])
+        if self.path.startswith("/moved"):
+            self.send_response(302)
+            self.send_header("Location", "/uha_anchor.json")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *a):
+        pass
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(net, "_CACHE_DIR", str(tmp_path / "cache"))
+    _Handler.hits = []
+    _Handler.ports = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+def test_conditional_get_ttl_and_offline(server):
+    url = server + "/uha_anchor.json"
+    first = net.cached_fetch(url)
+    assert net.cached_fetch(url) == first
+    assert _Handler.hits == [("/uha_anchor.json", None), ("/uha_anchor.json", '"v1"')]
+    net.cached_fetch(url, ttl=3600)
+    net.cached_fetch(url, offline=True)
+    assert len(_Handler.hits) == 2
+    with pytest.raises(net.CacheMiss):
+        net.cached_fetch(server + "/other.json", offline=True)
+    assert resolve_uha_address(url)["anchor_id"] == "T"
+
+def test_lru_eviction(server, monkeypatch):
+    monkeypatch.setenv("UNREANCHOR_CACHE_MAX_BYTES", str(len(_Handler.body) * 2))
+    paths = [net.cached_fetch(f"{server}/a{i}.json") for i in range(3)]
+    with net._index() as idx:
+        assert len(idx) == 2
+    assert not os.path.exists(paths[0])
+
+def test_client_pools_connections_and_dedups(server):
+    client = net.FetchClient()
+    client.fetch(server + "/moved")
+    for i in range(3):
+        client.fetch(f"{server}/k{i}.json")
+    assert len(_Handler.ports) == 1
+    got = client.prefetch({i: server + "/same.json" for i in range(4)})
+    assert len(set(got.values())) == 1
+    client.close()
@@ -0,0 +1,29 @@
+import itertools
+import numpy as np, pandas as pd
+from un_reanchor.pairing import cross_instrument_pairs
+
+def _brute(df):
+    n = ex = 0
+    for _, g in df.groupby("part_id"):
+        if g["instrument_id"].nunique() < 2: continue
+        m, u = g["measured"].to_numpy(), g["uncertainty_U"].to_numpy()
+        for i, j in itertools.combinations(range(len(g)), 2):
+            n += 1
+            ex += abs(m[i] - m[j]) > u[i] + u[j]
+    return n, ex
+
+def test_pairing_strategies_match_bruteforce():
+    rng = np.random.default_rng(1)
+    n = 1500
+    df = pd.DataFrame({
+        "part_id": rng.integers(0, 60, n),
+        "measured": rng.normal(10, 0.02, n),
+        "uncertainty_U": rng.uniform(0, 0.02, n),
+        "instrument_id": rng.choice(["A", "B", "C"], n),
+    })
+    expected = _brute(df)
+    for kw in ({}, {"small_group": 4, "dense_limit": 16}, {"small_group": 1, "dense_limit": 1}):
+        r = cross_instrument_pairs(df["part_id"], df["instrument_id"], df["measured"], df["uncertainty_U"],
+                                   by_instrument=True, **kw)
+        assert (r["n_pairs"], r["n_exceed"]) == expected
+        assert r["pairs"].sum() == expected[0] and r["exceed"].sum() == expected[1]
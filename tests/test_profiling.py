@@ -0,0 +1,33 @@
+import json, sys
+import pandas as pd, yaml
+from un_reanchor.profiling import Profiler, profiling, stage
+from un_reanchor.un_validation import run_all
+
+def test_run_all_stages_and_hooks(tmp_path):
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    df = pd.read_csv("data/demo.csv")
+    seen = []
+    with profiling(Profiler(memory=True, dump_dir=str(tmp_path), hooks=[lambda name, rec: seen.append(name)])) as prof:
+        run_all(df, cfg)
+        with stage("outer"):
+            with stage("inner", rows=10):
+                big = bytearray(8 << 20)
+            del big
+    t = prof.timings()
+    assert {"spec_limits", "UN-T1", "UN-T2", "UN-T3", "UN-T4", "UN-T5", "UN-T6"} <= set(t)
+    assert t["UN-T1"]["rows"] == len(df) and t["UN-T1"]["rows_per_s"] > 0
+    # the inner stage's allocation also counts toward the enclosing stage's peak
+    assert t["inner"]["peak_mb"] >= 8 and t["outer"]["peak_mb"] >= 8
+    assert seen[-2:] == ["inner", "outer"]
+    assert (tmp_path / "UN-T3.prof").exists() and (tmp_path / "UN-T3.tracemalloc.txt").exists()
+    with stage("ignored") as st:  # no active profiler: a no-op
+        st.rows = 1
+
+def test_cli_profile_writes_timings(tmp_path, monkeypatch, capsys):
+    from un_reanchor.cli import main
+    monkeypatch.setattr(sys, "argv", ["unreanchor", "run", "--data", "data/demo.csv",
+                                      "--config", "configs/config.sample.yaml", "--out", str(tmp_path), "--profile"])
+    main()
+    assert "UN-T3" in capsys.readouterr().err
+    timings = json.load(open(tmp_path / "report.json"))["timings"]
+    assert {"fetch", "header", "parse", "spec_limits", "UN-T3", "write_decisions"} <= set(timings)
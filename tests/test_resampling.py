@@ -0,0 +1,58 @@
+import json
+import numpy as np, pandas as pd, yaml
+from un_reanchor.un_validation import run_all
+from un_reanchor.streaming import run_all_chunked
+from un_reanchor.un_ct1 import un_CT1_cosmology, un_CT1_table, read_h0_csv
+from un_reanchor.resampling import bootstrap_rates, percentile_ci
+
+_DATASET = dict(seed=11, parts=150, instruments=("A", "B"), true_share=0.4, timestamps=None)
+
+def test_bootstrap_cis_are_seeded_and_chunk_independent(tmp_path, make_dataset):
+    df = make_dataset(700, **_DATASET)
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    cfg["params"].update(bootstrap_n=2000, seed=7)
+    report, _ = run_all(df, cfg)
+    for test, key in (("UN-T1", "coverage_rate"), ("UN-T2", "agreement_with_archival"), ("UN-T3", "exceed_rate"),
+                      ("UN-T5", "indeterminate_rate"), ("UN-T6", "coverage")):
+        lo, hi = report[test][key + "_ci"]
+        assert lo <= report[test][key] <= hi and hi - lo < 0.5
+    assert set(report["UN-T2"]["share_ci"]) == set(report["UN-T2"]["share"])
+    assert report["bootstrap"] == {"n": 2000, "ci_level": 0.95, "seed": 7}
+    assert run_all(df, cfg)[0] == report
+    chunks = (df.iloc[s:s + 90] for s in range(0, len(df), 90))
+    assert json.dumps(run_all_chunked(chunks, cfg), sort_keys=True) == json.dumps(report, sort_keys=True)
+
+def test_type_count_bootstrap_matches_index_matrix_bootstrap():
+    rng = np.random.default_rng(0)
+    x = rng.random(400) < 0.3
+    idx = rng.integers(0, len(x), size=(4000, len(x)))  # the textbook index-matrix bootstrap
+    expected = percentile_ci(x[idx].mean(axis=1), 0.9)
+    got = bootstrap_rates([(~x).sum(), x.sum()], {"p": ([False, True], [True, True])}, 4000, 0.9, np.random.default_rng(1))["p"]
+    assert np.allclose(got, expected, atol=0.01)
+
+def test_ct1_monte_carlo(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 300
+    df = pd.DataFrame({"label": [f"r{i}" for i in range(n)], "H0": rng.normal(70, 3, n),
+                       "uncertainty_U": rng.uniform(0.5, 2, n), "frame": "early-CMB"})
+    df.to_csv(tmp_path / "h0.csv", index=False)
+    anchor = json.load(open("configs/uha_anchor.example.json"))
+    anchors = [anchor, dict(anchor, anchor_id="ALT", value=anchor["value"] + 2)]
+    params = {"mc_draws": 600, "seed": 3, "coverage_k": 2.0}
+    summary, res = un_CT1_cosmology(df, anchors, params)
+    for s in summary["anchors"]:
+        mc = s["monte_carlo"]
+        assert mc["draws"] == 600 and mc["holds_rate_ci"][0] <= mc["holds_rate"] <= mc["holds_rate_ci"][1]
+    assert res["p_holds"].between(0, 1).all()
+    # draws do not depend on the number of worker processes, and both UN-CT1 paths agree
+    summary2, cols = un_CT1_table(read_h0_csv(str(tmp_path / "h0.csv")), anchors, {**params, "resample_workers": 2})
+    assert summary2 == summary and np.array_equal(cols["p_holds"], res["p_holds"].to_numpy())
+    # no anchor noise beyond the rows' own: compare with the normal probability of |H0 + e - a| <= rhs
+    from math import erf, sqrt
+    a = dict(anchor, u=0.0)
+    _, one = un_CT1_cosmology(df, a, {"mc_draws": 4000, "seed": 1})
+    sd = one["U"] / 2.0
+    cdf = lambda z: 0.5 * (1 + np.vectorize(erf)(z / sqrt(2)))
+    d = one["H0"] - one["anchor_value"]
+    p = cdf((one["rhs"] - d) / sd) - cdf((-one["rhs"] - d) / sd)
+    assert np.abs(one["p_holds"] - p).max() < 0.04
@@ -0,0 +1,56 @@
+import json, filecmp, os, yaml
+from un_reanchor import cli, un_validation
+from un_reanchor import resultcache
+from un_reanchor.resultcache import ResultCache
+
+def _cfg(**params):
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    cfg["params"].update(params)
+    return cfg
+
+def _report(out):
+    return json.load(open(out / "report.json"))
+
+def test_per_test_reuse(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cli.run_dataset("data/demo.csv", _cfg(), str(tmp_path / "a"), cache=cache)
+    runs = []
+    real = un_validation.run_all
+    monkeypatch.setattr(un_validation, "run_all", lambda df, cfg, tests=None: runs.append(tests) or real(df, cfg, tests))
+    cli.run_dataset("data/demo.csv", _cfg(), str(tmp_path / "b"), cache=cache)
+    assert runs == [] and _report(tmp_path / "b") == _report(tmp_path / "a")
+    assert filecmp.cmp(tmp_path / "a" / "decisions.csv", tmp_path / "b" / "decisions.csv", shallow=False)
+    # only the guard-band tests read gamma
+    cli.run_dataset("data/demo.csv", _cfg(gamma=2.0), str(tmp_path / "c"), cache=cache)
+    assert runs == [["UN-T2", "UN-T5"]]
+    cli.run_dataset("data/demo.csv", _cfg(gamma=2.0), str(tmp_path / "d"))
+    assert _report(tmp_path / "c") == _report(tmp_path / "d")
+    assert filecmp.cmp(tmp_path / "c" / "decisions.csv", tmp_path / "d" / "decisions.csv", shallow=False)
+
+def test_un_ct1_reuse(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    args = ("data/h0_pairs.csv", _cfg(), str(tmp_path / "a"), "configs/uha_anchor.example.json")
+    _, first, _ = cli.run_dataset(*args, cache=cache)
+    monkeypatch.setattr(cli, "_read_h0", lambda inp: (_ for _ in ()).throw(AssertionError("recomputed")))
+    _, again, _ = cli.run_dataset(*args[:2], str(tmp_path / "b"), args[3], cache=cache)
+    assert again == first
+    assert filecmp.cmp(tmp_path / "a" / "un_ct1_results.csv", tmp_path / "b" / "un_ct1_results.csv", shallow=False)
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2500)
+    for i in range(4):
+        cache.store(f"{i:064x}", {"v": "x" * 1000})
+        cache.load(f"{0:064x}")  # keeps entry 0 recently used
+    assert [cache.load(f"{i:064x}") is not None for i in range(4)] == [True, False, False, True]
+    with open(tmp_path / "cache" / "index.json") as f:
+        assert sum(e["size"] for e in json.load(f).values()) <= 2500
+
+def test_key_covers_package_sources(tmp_path):
+    pkg = os.path.dirname(resultcache.__file__)
+    for name in ("resultcache.py", "drift.py"):
+        (tmp_path / name).write_bytes(open(os.path.join(pkg, name), "rb").read())
+    before = resultcache.source_digest(tmp_path)
+    with open(tmp_path / "drift.py", "a") as f:
+        f.write("# edited\n")
+    assert resultcache.source_digest(tmp_path) != before
+    assert resultcache._version().endswith("+" + resultcache.source_digest(pkg)[:16])
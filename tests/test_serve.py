@@ -0,0 +1,95 @@
+import http.client, json, os, shutil, socket, threading
+import pandas as pd, pytest, yaml
+from un_reanchor.serve import ValidationService, make_server
+from un_reanchor.un_validation import run_all
+
+ANCHOR = "configs/uha_anchor.example.json"
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    for name in ("data/demo.csv", "data/h0_pairs.csv", "configs/config.sample.yaml", ANCHOR):
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(name, root / name)
+    service = ValidationService(os.path.abspath("configs/config.sample.yaml"), workers=2, data_root=str(root),
+                                max_upload=1 << 20)
+    monkeypatch.chdir(root)
+    srv = make_server(service, port=0, quiet=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown(); srv.server_close(); service.close()
+
+def _post(srv, path, body, ctype="application/json", headers=None):
+    conn = http.client.HTTPConnection(*srv.server_address[:2])
+    conn.request("POST", path, body=body if isinstance(body, bytes) else json.dumps(body),
+                 headers={"Content-Type": ctype, **(headers or {})})
+    r = conn.getresponse()
+    return r.status, json.loads(r.read()), r.getheader("X-Unreanchor-Kind")
+
+def test_validate_path_upload_and_h0(server, tmp_path):
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    expected, _ = run_all(pd.read_csv("data/demo.csv"), cfg)
+    status, report, kind = _post(server, "/validate", {"data": "data/demo.csv"})
+    assert status == 200 and kind == "metrology" and report == json.loads(json.dumps(expected))
+    status, report, _ = _post(server, "/validate?format=csv", open("data/demo.csv", "rb").read(), "text/csv")
+    assert status == 200 and report == json.loads(json.dumps(expected))
+    for _ in range(2):
+        status, summary, kind = _post(server, "/validate", {"data": "data/h0_pairs.csv", "uha": ANCHOR, "out": "out"})
+        assert status == 200 and kind == "h0" and summary["counts"]["n"] > 0
+    assert (tmp_path / "root" / "out" / "un_ct1_summary.json").exists()
+    stats = server.service.stats()
+    assert stats["anchors"] == {"size": 1, "hits": 1, "misses": 1} and stats["configs"]["hits"] >= 1
+    assert _post(server, "/validate", {"data": "/etc/passwd"})[0] == 403
+    assert _post(server, "/validate", {"data": "data/missing.csv"})[0] == 404
+
+def test_request_paths_stay_under_data_root(server, tmp_path):
+    shutil.copy("configs/uha_anchor.example.json", tmp_path / "anchor.json")
+    outside = [{"data": "data/demo.csv", "out": str(tmp_path / "reports")},
+               {"data": "data/demo.csv", "out": "../reports"},
+               {"data": "data/demo.csv", "config": "/etc/passwd"},
+               {"data": "data/h0_pairs.csv", "uha": f"file:{tmp_path / 'anchor.json'}"},
+               {"data": "data/h0_pairs.csv", "uha": str(tmp_path / "anchor.json")}]
+    for req in outside:
+        assert _post(server, "/validate", req)[0] == 403, req
+    assert _post(server, "/validate?format=csv&out=/tmp/x", b"a,b\n1,2\n", "text/csv")[0] == 403
+    assert not (tmp_path / "reports").exists()
+
+def test_remote_addresses_need_allow_remote(server):
+    # the server must not fetch URLs named by clients when it is confined to a data root
+    for req in ({"data": "http://127.0.0.1:9/d.csv"},
+                {"data": "data/h0_pairs.csv", "uha": "https://127.0.0.1:9/uha_anchor.json"},
+                {"data": "data/h0_pairs.csv", "uha": "zenodo:10.5281/zenodo.1?file=uha_anchor.json"}):
+        status, body, _ = _post(server, "/validate", req)
+        assert status == 403 and "--allow-remote" in body["error"], req
+
+def test_upload_size_limit(server):
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    conn.putrequest("POST", "/validate?format=csv")
+    conn.putheader("Content-Type", "text/csv")
+    conn.putheader("Content-Length", str((1 << 20) + 1))
+    conn.endheaders()
+    r = conn.getresponse()
+    assert r.status == 413 and "limit" in json.loads(r.read())["error"]
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket(tmp_path):
+    service = ValidationService("configs/config.sample.yaml", workers=1)
+    path = str(tmp_path / "s.sock")
+    srv = make_server(service, socket_path=path, quiet=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        with socket.socket(socket.AF_UNIX) as s:
+            s.connect(path)
+            s.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            data = b"".join(iter(lambda: s.recv(65536), b""))
+        assert data.startswith(b"HTTP/1.1 200") and b'"status": "ok"' in data
+    finally:
+        srv.shutdown(); srv.server_close(); service.close()
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket_keeps_regular_files(tmp_path):
+    path = tmp_path / "s.sock"
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        make_server(ValidationService(workers=1), socket_path=str(path), quiet=True)
+    assert path.read_text() == "not a socket"
@@ -0,0 +1,38 @@
+import itertools, math
+import numpy as np, pandas as pd, yaml
+from un_reanchor import sweep as sw
+from un_reanchor.un_validation import run_all
+
+def test_sweep_matches_run_all(monkeypatch):
+    rng = np.random.default_rng(5)
+    n = 3000
+    df = pd.DataFrame({"part_id": np.arange(n) // 2, "nominal": 10.0, "tol_lower": 0.05, "tol_upper": 0.05,
+                       "measured": 10 + rng.normal(0, 0.03, n), "true_value": np.where(rng.random(n) < 0.3, 10.0, np.nan),
+                       "sigma": rng.uniform(0.001, 0.01, n), "instrument_id": rng.choice(["A", "B"], n),
+                       "accepted": rng.integers(0, 2, n)})
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    cfg["columns"]["uncertainty_U"] = None
+    monkeypatch.setattr(sw, "MAX_ELEMS", 1000)  # several row blocks
+    gammas, ks, deltas = sw.parse_grid("0.5:2:4"), [1.0, 2.0, 3.0], [0.01, 0.04]
+    table = sw.sweep(df, cfg, gammas, ks, deltas)
+    assert list(table.columns) == sw.SWEEP_COLUMNS and len(table) == 4 * 3 * 2 * 8
+    got = table.set_index(["gamma", "coverage_k", "edge_delta", "test", "metric"])["value"]
+    for g, k, d in itertools.product(gammas, ks, deltas):
+        cfg["params"].update(gamma=g, coverage_k=k, edge_delta=d)
+        report, _ = run_all(df, cfg)
+        expected = {("UN-T1", "coverage_rate"): report["UN-T1"]["coverage_rate"],
+                    ("UN-T2", "agreement_with_archival"): report["UN-T2"]["agreement_with_archival"],
+                    ("UN-T5", "n_edge"): report["UN-T5"]["n_edge"],
+                    ("UN-T5", "indeterminate_rate"): report["UN-T5"]["indeterminate_rate"],
+                    ("UN-T6", "coverage"): report["UN-T6"]["coverage"],
+                    **{("UN-T2", f"share.{k_}"): v for k_, v in report["UN-T2"]["share"].items()}}
+        for key, v in expected.items():
+            value = got[(g, k, d, *key)]
+            assert (math.isnan(value) if v is None else value == v), (g, k, d, key)
+
+def test_run_sweep_writes_table(tmp_path):
+    from un_reanchor.cli import run_sweep
+    cfg = yaml.safe_load(open("configs/config.sample.yaml"))
+    path = run_sweep("data/demo.csv", cfg, str(tmp_path), gamma="0.5:1.5:3", edge_delta="0.01,0.05")
+    table = pd.read_csv(path)
+    assert len(table) == 3 * 1 * 2 * 8 and set(table["coverage_k"]) == {2.0}
@@ -0,0 +1,35 @@
+import json
+import numpy as np, pandas as pd
+from un_reanchor.un_ct1 import un_CT1_cosmology
+
+def test_multi_anchor_long_format():
+    df = pd.read_csv("data/h0_pairs.csv")
+    anchor = json.load(open("configs/uha_anchor.example.json"))
+    other = dict(anchor, anchor_id="ALT", value=73.0, t_interframe={"default": 0.5})
+    single, res1 = un_CT1_cosmology(df, "configs/uha_anchor.example.json")
+    summary, res = un_CT1_cosmology(df, [anchor, other])
+    assert summary["anchors"][0] == single
+    assert list(res["anchor_id"]) == ["DESI2024_BAO_BBN"] * 4 + ["ALT"] * 4
+    pd.testing.assert_frame_equal(res.iloc[:4], res1)
+    alt = res[res["anchor_id"] == "ALT"]
+    assert (alt["T_used"] == 0.5).all()
+    assert (alt["holds"] == ((alt["H0"] - 73.0).abs() <= alt["U"] + 0.62 + 0.5)).all()
+
+def test_csv_fast_path_matches_pandas(tmp_path):
+    from un_reanchor.dataio import inspect_input
+    from un_reanchor.un_ct1 import read_h0_csv, un_CT1_table, write_results_csv
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({"label": [f"0{i}" if i % 7 else "" for i in range(n)],
+                       "H0": np.where(rng.random(n) < 0.05, np.nan, rng.normal(70, 3, n) / 3 * 3),
+                       "uncertainty_U": rng.uniform(0.1, 3, n),
+                       "frame": rng.choice(["late-Cepheid+SNe", "early-CMB", "", "a,b"], n)})
+    df.to_csv(tmp_path / "h0.csv", index=False)
+    anchor = json.load(open("configs/uha_anchor.example.json"))
+    anchors = [anchor, dict(anchor, anchor_id="ALT", value=73.0)]
+    summary, res = un_CT1_cosmology(inspect_input(str(tmp_path / "h0.csv")).read(), anchors)
+    summary2, cols = un_CT1_table(read_h0_csv(str(tmp_path / "h0.csv")), anchors)
+    assert summary2 == summary
+    res.to_csv(tmp_path / "a.csv", index=False)
+    write_results_csv(cols, tmp_path / "b.csv")
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()